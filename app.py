@@ -3,6 +3,9 @@ import dash_auth
 import dash_bootstrap_components as dbc
 import flask
 
+import datamanager
+from push import init_push
+
 
 # Keep this out of source code repository - save in a file or a database
 VALID_USERNAME_PASSWORD_PAIRS = {
@@ -11,7 +14,17 @@ VALID_USERNAME_PASSWORD_PAIRS = {
 server = flask.Flask(__name__)
 app = dash.Dash(__name__, server=server, external_stylesheets=[dbc.themes.DARKLY])
 app.config.suppress_callback_exceptions = True
+# registered before BasicAuth so the event stream is protected as well
+init_push(server)
 auth = dash_auth.BasicAuth(
     app,
     VALID_USERNAME_PASSWORD_PAIRS
-)
\ No newline at end of file
+)
+
+
+# readiness probe of the load balancer, answered with 503 until the datasets
+# are loaded; registered after BasicAuth so the probe needs no credentials
+@server.route('/ready')
+def ready():
+    state = datamanager.readiness()
+    return flask.jsonify(state), 200 if state['ready'] else 503
@@ -1,21 +1,18 @@
-import json
 import dash_core_components as dcc
 import dash_html_components as html
-import pandas as pd
-import plotly.graph_objs as go
-from dash.dependencies import Input, Output
+from dash.dependencies import ClientsideFunction, Input, Output, State
+from dash.exceptions import PreventUpdate
 from telegram_definition_L1 import *
 from app import app, dbc
-from datetime import datetime as dt
-from datamanager import get_process_data
+from datamanager import get_process_points
+from traces import item_options, point_figure, time_layout
 
 
 def get_dataframe():
-    """Retrieve the dataframe from Redis
-    This dataframe is periodically updated through the redis task
+    """Measuring point frames of the rings, or of the current export when
+    there are none, shared by every callback and session
     """
-    jsonified_df = get_process_data()
-    return json.loads(jsonified_df)
+    return get_process_points()
 
 
 first_card = [
@@ -105,8 +102,14 @@ fourth_card = [
 def serve_layout():
     return html.Div([
         dbc.Alert(id="status_pseg", color='success'),
-        # Interval
-        dcc.Interval(interval=30 * 1000, id="interval_pseg"),
+        # data version pushed by the server (push.py), polled in the browser
+        dcc.Interval(interval=500, id="interval_pseg"),
+        dcc.Store(id='process_version'),
+        # newest segment each plot holds, per session
+        dcc.Store(id='atstand_cursor'),
+        dcc.Store(id='betweenstand_cursor'),
+        dcc.Store(id='beforfirststand_cursor'),
+        dcc.Store(id='afterlaststand_cursor'),
         # Cards
         dbc.Row(
             [
@@ -126,98 +129,45 @@ def serve_layout():
 '''
 
 
+app.clientside_callback(
+    ClientsideFunction(namespace='push', function_name='process'),
+    Output('process_version', 'data'),
+    [Input("interval_pseg", "n_intervals")],
+    [State('process_version', 'data')])
+
+
+# the columns the frames hold, which split multi-valued fields when they
+# come from the rings
+@app.callback(
+    [Output('atstand-list', 'options'), Output('betweenstand-list', 'options'),
+     Output('beforfirststand-list', 'options'), Output('afterlaststand-list', 'options')],
+    [Input('process_version', 'data')],
+    [State('atstand-list', 'options'), State('betweenstand-list', 'options'),
+     State('beforfirststand-list', 'options'), State('afterlaststand-list', 'options')])
+def item_list_options(_, *options):
+    points = get_dataframe()
+    current = [
+        item_options(points, [1, 3, 5, 7, 9], [teltype_M21[i][0] for i in range(0, 125)]),
+        item_options(points, [2, 4, 6, 8], [teltype_M22[i][0] for i in range(0, 47)]),
+        item_options(points, [0], [teltype_M23[i][0] for i in range(0, 47)]),
+        item_options(points, [10], [teltype_M24[i][0] for i in range(0, 67)]),
+    ]
+    if current == list(options):
+        raise PreventUpdate
+    return current
+
+
 @app.callback(
-    Output('atstand_plot', 'figure'),
-    [Input('atstand-list', 'value'), Input("interval_pseg", "n_intervals")])
-def display_value(selected_dropdown_value, _):
-    dataset = get_dataframe()
-    data = json.loads(dataset)
-    MP_01 = pd.read_json(data['df_01'], orient='split')
-    MP_03 = pd.read_json(data['df_03'], orient='split')
-    MP_05 = pd.read_json(data['df_05'], orient='split')
-    MP_07 = pd.read_json(data['df_07'], orient='split')
-    MP_09 = pd.read_json(data['df_09'], orient='split')
-    # MP_01.to_csv('data', sep='\t', encoding='utf-8')
-    # index = pd.to_datetime(MP_02['time'], format="%Y-%m-%d %H:%M:%S.%f")
-
-    trace1 = []
-    trace3 = []
-    trace5 = []
-    trace7 = []
-    trace9 = []
-
-    for item in selected_dropdown_value:
-        # Create and style traces
-        trace1.append(go.Scatter(
-            x=MP_01['time'],
-            y=MP_01[item],
-            name=item + 'G1',
-            text=MP_01[item],
-            line=dict(
-                # color=('rgb(22, 96, 167)'),
-                dash='solid',
-                width=2, )
-        ))
-        trace3.append(go.Scatter(
-            x=MP_03['time'],
-            y=MP_03[item],
-            name=item + 'G2',
-            text=MP_03[item],
-            line=dict(
-                # color=('rgb(22, 96, 167)'),
-                width=2,
-                dash='solid')
-        ))
-        trace5.append(go.Scatter(
-            x=MP_05['time'],
-            y=MP_05[item],
-            name=item + 'G3',
-            text=MP_05[item],
-            line=dict(
-                # color=('rgb(22, 96, 167)'),
-                width=2,
-                dash='solid')
-        ))
-        trace7.append(go.Scatter(
-            x=MP_07['time'],
-            y=MP_07[item],
-            name=item + 'G4',
-            text=MP_07[item],
-            line=dict(
-                # color=('rgb(22, 96, 167)'),
-                width=2,
-                dash='solid')
-        ))
-        trace9.append(go.Scatter(
-            x=MP_09['time'],
-            y=MP_09[item],
-            name=item + 'G5',
-            text=MP_09[item],
-            line=dict(
-                #  color=('rgb(22, 96, 167)'),
-                width=2,
-                dash='solid')
-        ))
-    traces = [trace1, trace3, trace5, trace7, trace9]
-    data = [val for sublist in traces for val in sublist]
-
-    # Edit the layout
-    layout = dict(title='Process Data at stands "{}"'.format(selected_dropdown_value),
-                  xaxis={"title": "Date Time",
-                         'rangeselector': {'buttons': list([
-                             {'count': 1, 'label': '1M', 'step': 'minute', 'stepmode': 'backward'},
-                             {'count': 10, 'label': '6M', 'step': 'minute', 'stepmode': 'backward'},
-                             {'step': 'all'}
-                         ])}, 'rangeslider': {'visible': True}, 'type': 'date'},
-                  # yaxis=dict(title='Values'),
-                  margin={'l': 40, 'b': 40, 't': 10, 'r': 10},
-                  legend={'x': 0, 'y': 1},
-                  hovermode='closest'
-                  )
-
-    # Plot and embed
-    fig = dict(data=data, layout=layout)
-    return fig
+    [Output('atstand_plot', 'figure'), Output('atstand_plot', 'extendData'), Output('atstand_cursor', 'data')],
+    [Input('atstand-list', 'value'), Input('process_version', 'data'),
+     Input('atstand_plot', 'relayoutData')],
+    [State('atstand_cursor', 'data')])
+def display_value(selected_dropdown_value, _, relayout_data, cursor):
+    labels = {1: 'G1', 3: 'G2', 5: 'G3', 7: 'G4', 9: 'G5'}
+    layout = time_layout('Process Data at stands "{}"'.format(selected_dropdown_value), rangeslider=True,
+                         uirevision='atstand_plot')
+    return point_figure(get_dataframe(), labels, selected_dropdown_value, layout, 'process_version.data', cursor,
+                        relayout_data)
 
 
 '''
@@ -226,94 +176,23 @@ def display_value(selected_dropdown_value, _):
 
 
 @app.callback(
-    Output('betweenstand_plot', 'figure'),
-    [Input('betweenstand-list', 'value'), Input("interval_pseg", "n_intervals")])
-def display_value(selected_dropdown_value, _):
-    dataset = get_dataframe()
-    data = json.loads(dataset)
-
-    MP_02 = pd.read_json(data['df_02'], orient='split')
-    MP_04 = pd.read_json(data['df_04'], orient='split')
-    MP_06 = pd.read_json(data['df_06'], orient='split')
-    MP_08 = pd.read_json(data['df_08'], orient='split')
-    # MP_01.to_csv('data', sep='\t', encoding='utf-8')
-    # index = pd.to_datetime(MP_02['time'], format="%Y-%m-%d %H:%M:%S.%f")
-    trace2 = []
-    trace4 = []
-    trace6 = []
-    trace8 = []
-
-    for item in selected_dropdown_value:
-        trace2.append(go.Scatter(
-            x=MP_02['time'],
-            y=MP_02[item],
-            name=item + ' G1-G2',
-            text=MP_02[item],
-            line=dict(
-                # color=('rgb(205, 12, 24)'),
-                width=2,
-                dash='solid')  # dash options include 'dash', 'dot', and 'dashdot'
-        ))
-        trace4.append(go.Scatter(
-            x=MP_04['time'],
-            y=MP_04[item],
-            name=item + ' G2-G3',
-            text=MP_04[item],
-            line=dict(
-                # color=('rgb(205, 12, 24)'),
-                width=2,
-                dash='solid')
-        ))
-        trace6.append(go.Scatter(
-            x=MP_06['time'],
-            y=MP_06[item],
-            name=item + ' G3-G4',
-            text=MP_06[item],
-            line=dict(
-                #  color=('rgb(22, 96, 167)'),
-                width=2,
-                dash='solid')
-        ))
-        trace8.append(go.Scatter(
-            x=MP_08['time'],
-            y=MP_08[item],
-            name=item + ' G4-G5',
-            text=MP_08[item],
-            line=dict(
-                # color=('rgb(22, 96, 167)'),
-                width=2,
-                dash='solid')
-        ))
-    traces = [trace2, trace4, trace6, trace8]
-    data = [val for sublist in traces for val in sublist]
-
-    # Edit the layout
-    layout = dict(title='Process Data Between stands "{}"'.format(selected_dropdown_value),
-                  xaxis={"title": "Date Time",
-                         'rangeselector': {'buttons': list([
-                             {'count': 1, 'label': '1M', 'step': 'minute', 'stepmode': 'backward'},
-                             {'count': 10, 'label': '6M', 'step': 'minute', 'stepmode': 'backward'},
-                             {'step': 'all'}
-                         ])}, 'rangeslider': {'visible': True}, 'type': 'date'},
-                  # yaxis=dict(title='Values'),
-                  margin={'l': 40, 'b': 40, 't': 10, 'r': 10},
-                  legend={'x': 0, 'y': 1},
-                  hovermode='closest'
-                  )
-
-    # Plot and embed
-    fig = dict(data=data, layout=layout)
-    return fig
-
-
-@app.callback(
+    [Output('betweenstand_plot', 'figure'), Output('betweenstand_plot', 'extendData'), Output('betweenstand_cursor', 'data')],
+    [Input('betweenstand-list', 'value'), Input('process_version', 'data'),
+     Input('betweenstand_plot', 'relayoutData')],
+    [State('betweenstand_cursor', 'data')])
+def display_value(selected_dropdown_value, _, relayout_data, cursor):
+    labels = {2: ' G1-G2', 4: ' G2-G3', 6: ' G3-G4', 8: ' G4-G5'}
+    layout = time_layout('Process Data Between stands "{}"'.format(selected_dropdown_value), rangeslider=True,
+                         uirevision='betweenstand_plot')
+    return point_figure(get_dataframe(), labels, selected_dropdown_value, layout, 'process_version.data', cursor,
+                        relayout_data)
+
+
+app.clientside_callback(
+    ClientsideFunction(namespace='ui', function_name='status'),
     Output("status_pseg", "children"),
-    [Input('atstand-list', 'value'), Input("interval_pseg", "n_intervals")],
+    [Input('atstand-list', 'value'), Input('process_version', 'data')],
 )
-def update_status(value, _):
-    time_now = str(dt.now())
-    data_last_updated = dt.strptime(time_now[:19], "%Y-%m-%d %H:%M:%S")
-    return "Data last updated at {} UTC".format(data_last_updated)
 
 
 '''
@@ -322,47 +201,16 @@ def update_status(value, _):
 
 
 @app.callback(
-    Output('beforfirststand_plot', 'figure'),
-    [Input('beforfirststand-list', 'value'), Input("interval_pseg", "n_intervals")])
-def display_value(selected_dropdown_value, _):
-    dataset = get_dataframe()
-    data = json.loads(dataset)
-    MP_00 = pd.read_json(data['df_00'], orient='split')
-    trace0 = []
-
-    for item in selected_dropdown_value:
-        # Create and style traces
-        trace0.append(go.Scatter(
-            x=MP_00['time'],
-            y=MP_00[item],
-            name=item + ' Before First Stand',
-            text=MP_00[item],
-            line=dict(
-                # color=('rgb(205, 12, 24)'),
-                dash='solid',
-                width=2)
-        ))
-
-    traces = [trace0]
-    data = [val for sublist in traces for val in sublist]
-
-    # Edit the layout
-    layout = dict(title='Process Data Before First stands "{}"'.format(selected_dropdown_value),
-                  xaxis={"title": "Date Time",
-                         'rangeselector': {'buttons': list([
-                             {'count': 1, 'label': '1M', 'step': 'minute', 'stepmode': 'backward'},
-                             {'count': 10, 'label': '6M', 'step': 'minute', 'stepmode': 'backward'},
-                             {'step': 'all'}
-                         ])}, 'rangeslider': {'visible': False}, 'type': 'date'},
-                  # yaxis=dict(title='Values'),
-                  margin={'l': 40, 'b': 40, 't': 10, 'r': 10},
-                  legend={'x': 0, 'y': 1},
-                  hovermode='closest'
-                  )
-
-    # Plot and embed
-    fig = dict(data=data, layout=layout)
-    return fig
+    [Output('beforfirststand_plot', 'figure'), Output('beforfirststand_plot', 'extendData'), Output('beforfirststand_cursor', 'data')],
+    [Input('beforfirststand-list', 'value'), Input('process_version', 'data'),
+     Input('beforfirststand_plot', 'relayoutData')],
+    [State('beforfirststand_cursor', 'data')])
+def display_value(selected_dropdown_value, _, relayout_data, cursor):
+    labels = {0: ' Before First Stand'}
+    layout = time_layout('Process Data Before First stands "{}"'.format(selected_dropdown_value), rangeslider=False,
+                         uirevision='beforfirststand_plot')
+    return point_figure(get_dataframe(), labels, selected_dropdown_value, layout, 'process_version.data', cursor,
+                        relayout_data)
 
 
 '''
@@ -371,44 +219,13 @@ def display_value(selected_dropdown_value, _):
 
 
 @app.callback(
-    Output('afterlaststand_plot', 'figure'),
-    [Input('afterlaststand-list', 'value'), Input("interval_pseg", "n_intervals")])
-def display_value(selected_dropdown_value, _):
-    dataset = get_dataframe()
-    data = json.loads(dataset)
-    MP_10 = pd.read_json(data['df_10'], orient='split')
-    # MP_01.to_csv('data', sep='\t', encoding='utf-8')
-    # index = pd.to_datetime(MP_02['time'], format="%Y-%m-%d %H:%M:%S.%f")
-    trace10 = []
-
-    for item in selected_dropdown_value:
-        trace10.append(go.Scatter(
-            x=MP_10['time'],
-            y=MP_10[item],
-            name=item + ' After Last Stand',
-            text=MP_10[item],
-            line=dict(
-                #  color=('rgb(22, 96, 167)'),
-                width=2,
-                dash='solid')
-        ))
-    traces = [trace10]
-    data = [val for sublist in traces for val in sublist]
-
-    # Edit the layout
-    layout = dict(title='Process Data After Last stands "{}"'.format(selected_dropdown_value),
-                  xaxis={"title": "Date Time",
-                         'rangeselector': {'buttons': list([
-                             {'count': 1, 'label': '1M', 'step': 'minute', 'stepmode': 'backward'},
-                             {'count': 10, 'label': '6M', 'step': 'minute', 'stepmode': 'backward'},
-                             {'step': 'all'}
-                         ])}, 'rangeslider': {'visible': False}, 'type': 'date'},
-                  # yaxis=dict(title='Values'),
-                  margin={'l': 40, 'b': 40, 't': 10, 'r': 10},
-                  legend={'x': 0, 'y': 1},
-                  hovermode='closest'
-                  )
-
-    # Plot and embed
-    fig = dict(data=data, layout=layout)
-    return fig
+    [Output('afterlaststand_plot', 'figure'), Output('afterlaststand_plot', 'extendData'), Output('afterlaststand_cursor', 'data')],
+    [Input('afterlaststand-list', 'value'), Input('process_version', 'data'),
+     Input('afterlaststand_plot', 'relayoutData')],
+    [State('afterlaststand_cursor', 'data')])
+def display_value(selected_dropdown_value, _, relayout_data, cursor):
+    labels = {10: ' After Last Stand'}
+    layout = time_layout('Process Data After Last stands "{}"'.format(selected_dropdown_value), rangeslider=False,
+                         uirevision='afterlaststand_plot')
+    return point_figure(get_dataframe(), labels, selected_dropdown_value, layout, 'process_version.data', cursor,
+                        relayout_data)
@@ -2,18 +2,21 @@
 import math
 from datetime import datetime as dt
 
+import dash
 import dash_core_components as dcc
 import dash_html_components as html
 import dash_table
 import numpy as np
 import pandas as pd
-import plotly.figure_factory as ff
-from dash.dependencies import Input, Output, State
+from dash.dependencies import ClientsideFunction, Input, Output, State
 from dash.exceptions import PreventUpdate
 from plotly import graph_objs as go
 import random
 from app import app, dbc
-from datamanager import get_production, get_coil_tracking
+from downsample import relayout_range
+from gantt import timeline_figure
+from datamanager import get_production, get_coil_tracking_index, get_production_rollup, register_query, query_frame, \
+    get_frame, frame_params, is_current, memoize_figure
 
 
 # returns pie chart that shows coils per alloycode
@@ -62,8 +65,9 @@ def thickness_pie_source(df):
 
 
 def thickness_source(df):
-    types = df["EXITTHICK"]
-    values = df["count"]
+    # plain lists, so the browser can filter them (see assets/ui.js)
+    types = df["EXITTHICK"].tolist()
+    values = df["count"].tolist()
     data = [go.Scatter(x=types, y=values, fill='tozeroy', line=dict(dash='solid', width=2),
                        marker_color='rgb(55, 83, 109)')]
     layout = dict(
@@ -76,19 +80,30 @@ def thickness_source(df):
     return {"data": data, "layout": layout}
 
 
-# function to perform date range filter
-def filter_data(df, start_date, end_date):
-    if start_date is not None:
-        start_date = pd.to_datetime(start_date)
-    if end_date is not None:
-        end_date = pd.to_datetime(end_date)
+# production frame behind the time_df key
+@register_query('production')
+def production_frame(start_date, end_date):
+    df = get_production() if start_date is None else get_production(start_date, end_date)
+    df['Date'] = df.DTENDROLLING.dt.normalize()
+    return df
+
 
-    df['DTENDROLLING'] = pd.to_datetime(df['DTENDROLLING'])
+# production weight in tons per year, month or day of the time_df date range
+def production_weights(key, by):
+    params = frame_params(key)
+    totals = get_production_rollup().totals(params['start_date'], params['end_date'], by=by)
+    totals['EXITWEIGHTMEAS'] = np.round(totals['weight'] / 1000)
+    return totals[[by, 'EXITWEIGHTMEAS']]
 
-    if start_date is not None:
-        mask = (df['DTENDROLLING'] > start_date) & (df['DTENDROLLING'] <= end_date)
-        df = df.loc[mask]
-    return df
+
+# coil count, weight in tons and weight per coil in kg of a production frame,
+# from a single reduction of the weight column
+def production_indicators(df):
+    coil_count = len(df)
+    if coil_count == 0:
+        return 0, 0, 0
+    tot_weight = np.nansum(df['EXITWEIGHTMEAS'].to_numpy())
+    return coil_count, math.floor(tot_weight / 1000), math.floor(tot_weight / coil_count)
 
 
 # Bar Chart for Weight Analysis
@@ -142,13 +157,14 @@ coil_tracking_model = [
         [
             html.Div([
                 dbc.Alert(id="Tracking-Text", color="info"),
-                html.Div("Production Date", className="d-inline p-2 bg-primary text-white"),
+                html.Div("Production Dates", className="d-inline p-2 bg-primary text-white"),
                 html.Div(
-                    dcc.DatePickerSingle(
-                        id='tracking-date-picker-single',
+                    dcc.DatePickerRange(
+                        id='tracking-date-range',
                         calendar_orientation='vertical',
-                        placeholder='Select a date',
-                        date=dt(2020, 3, 13)
+                        minimum_nights=0,
+                        start_date=dt(2020, 3, 13),
+                        end_date=dt(2020, 3, 13)
                     ), className="d-inline p-2 bg-dark text-white")
             ]
             ),
@@ -419,6 +435,8 @@ exit_thickness_count_graph = [
             dcc.Graph(
                 id="thickness_leads",
             ),
+            # thickness curve of the time_df frame, filtered by the slider in the browser
+            dcc.Store(id='thickness_curve'),
         ]
     ),
 ]
@@ -453,8 +471,9 @@ tables_card = html.Div(
 def serve_layout():
     return html.Div(
         [
-            # Interval
-            dcc.Interval(interval=300 * 1000, id="interval_prod"),
+            # data version pushed by the server (push.py), polled in the browser
+            dcc.Interval(interval=500, id="interval_prod"),
+            dcc.Store(id='production_version'),
             # Alert
             alert,
             # Indicators
@@ -471,124 +490,88 @@ def serve_layout():
     )
 
 
-@app.callback(
-    Output("status_prod", "children"),
+app.clientside_callback(
+    ClientsideFunction(namespace='push', function_name='production'),
+    Output('production_version', 'data'),
     [Input("interval_prod", "n_intervals")],
+    [State('production_version', 'data')])
+
+
+app.clientside_callback(
+    ClientsideFunction(namespace='ui', function_name='status'),
+    Output("status_prod", "children"),
+    [Input('production_version', 'data')],
 )
-def update_status(_):
-    time_now = str(dt.now())
-    data_last_updated = dt.strptime(time_now[:19], "%Y-%m-%d %H:%M:%S")
-    return "Data last updated at {} UTC".format(data_last_updated)
 
 
 @app.callback(Output('time_df', 'children'),
-              [Input("interval_prod", "n_intervals"), Input('submit-button', 'n_clicks')],
+              [Input('production_version', 'data'), Input('submit-button', 'n_clicks')],
               [State("date-picker-range", "start_date"),
-               State("date-picker-range", "end_date")])
-def update_output(_, n_clicks, start_date, end_date):
-    df = get_production()
-    df['DTENDROLLING'] = pd.to_datetime(df['DTENDROLLING'])
-    df['Date'] = df.DTENDROLLING.dt.date
+               State("date-picker-range", "end_date"),
+               State('time_df', 'children')])
+def update_output(_, n_clicks, start_date, end_date, key):
+    # a data refresh for the version the page already shows would only make
+    # the dependent callbacks redraw identical figures
+    refresh = [t['prop_id'] for t in dash.callback_context.triggered] == ['production_version.data']
+    if refresh and is_current(key):
+        raise PreventUpdate
     if n_clicks > 0:
-        df = filter_data(df, start_date, end_date)
-        if df.empty:
+        key = query_frame('production', start_date, end_date)
+        if get_frame(key).empty:
             raise PreventUpdate
-        return df.to_json(orient='split')
+        return key
     else:
-        return df.to_json(orient='split')
+        return query_frame('production')
 
 
 # module One
-@app.callback(
+app.clientside_callback(
+    ClientsideFunction(namespace='ui', function_name='toggle'),
     Output("modal", "is_open"),
     [Input("open", "n_clicks"), Input("close", "n_clicks")],
     [State("modal", "is_open")],
 )
-def toggle_modal(n1, n2, is_open):
-    if n1 or n2:
-        return not is_open
-    return is_open
 
 
 # Module Two
-@app.callback(
+app.clientside_callback(
+    ClientsideFunction(namespace='ui', function_name='toggle'),
     Output("modaltwo", "is_open"),
     [Input("opentwo", "n_clicks"), Input("closetwo", "n_clicks")],
     [State("modaltwo", "is_open")],
 )
-def toggle_modal(n1, n2, is_open):
-    if n1 or n2:
-        return not is_open
-    return is_open
 
 
 # Module Three
-@app.callback(
+app.clientside_callback(
+    ClientsideFunction(namespace='ui', function_name='toggle'),
     Output("modalthree", "is_open"),
     [Input("openthree", "n_clicks"), Input("closethree", "n_clicks")],
     [State("modalthree", "is_open")],
 )
-def toggle_modal(n1, n2, is_open):
-    if n1 or n2:
-        return not is_open
-    return is_open
 
 
 # Module Four
-@app.callback(
+app.clientside_callback(
+    ClientsideFunction(namespace='ui', function_name='toggle'),
     Output("modalfour", "is_open"),
     [Input("openfour", "n_clicks"), Input("closefour", "n_clicks")],
     [State("modalfour", "is_open")],
 )
-def toggle_modal(n1, n2, is_open):
-    if n1 or n2:
-        return not is_open
-    return is_open
-
-
-# updates left indicator based on df updates
-@app.callback(
-    Output("left_leads_indicator", "children"),
-    [Input("time_df", "children"), Input('submit-button', 'n_clicks')],
-    [State("date-picker-range", "start_date"),
-     State("date-picker-range", "end_date")]
-)
-def left_leads_indicator_callback(df, n_clicks, start_date, end_date):
-    df = pd.read_json(df, orient="split")
-    coil_count = len(df)
-    if coil_count > 0:
-        return coil_count
-    else:
-        return 0
-
-
-# updates middle indicator based on df updates
-@app.callback(
-    Output("middle_leads_indicator", "children"),
-    [Input("time_df", "children"), Input('submit-button', 'n_clicks')],
-    [State("date-picker-range", "start_date"),
-     State("date-picker-range", "end_date")]
-)
-def middle_leads_indicator_callback(df, n_clicks, start_date, end_date):
-    df = pd.read_json(df, orient="split")
-    return math.floor((df['EXITWEIGHTMEAS'].aggregate(sum)) / 1000)
 
 
-# updates right indicator based on df updates
+# updates the three indicators based on df updates
 @app.callback(
-    Output("right_leads_indicator", "children"),
+    [Output("left_leads_indicator", "children"),
+     Output("middle_leads_indicator", "children"),
+     Output("right_leads_indicator", "children")],
     [Input("time_df", "children"), Input('submit-button', 'n_clicks')],
     [State("date-picker-range", "start_date"),
      State("date-picker-range", "end_date")]
 )
-def right_leads_indicator_callback(df, n_clicks, start_date, end_date):
-    df = pd.read_json(df, orient="split")
-    coil_count = len(df)
-    if coil_count > 0:
-        tot_weight = df['EXITWEIGHTMEAS'].aggregate(sum)
-        return math.floor(tot_weight / coil_count)
-    else:
-        return 0
+@memoize_figure('key')
+def leads_indicator_callback(key, n_clicks, start_date, end_date):
+    return production_indicators(get_frame(key))
 
 
 # update pie chart figure df updates
@@ -598,8 +581,9 @@ def right_leads_indicator_callback(df, n_clicks, start_date, end_date):
     [State("date-picker-range", "start_date"),
      State("date-picker-range", "end_date")]
 )
-def alloy_source_callback(n_clicks, df, start_date, end_date):
-    df = pd.read_json(df, orient="split")
+@memoize_figure('key')
+def alloy_source_callback(n_clicks, key, start_date, end_date):
+    df = get_frame(key)
     if len(df) > 0:
         allycode_stats = df.groupby('ALLOYCODE')['EXITTHICK'].describe().reset_index()
         return alloy_source(allycode_stats)
@@ -614,12 +598,10 @@ def alloy_source_callback(n_clicks, df, start_date, end_date):
     [State("date-picker-range", "start_date"),
      State("date-picker-range", "end_date")]
 )
-def weight_source_callback(n_clicks, df, start_date, end_date):
-    df = pd.read_json(df, orient="split")
-    if len(df):
-        df['year'] = df.Date.dt.year
-        exitweightperday = df.groupby('year')['EXITWEIGHTMEAS'].sum().reset_index()
-        exitweightperday['EXITWEIGHTMEAS'] = np.round(exitweightperday.EXITWEIGHTMEAS / 1000)
+@memoize_figure('key')
+def weight_source_callback(n_clicks, key, start_date, end_date):
+    exitweightperday = production_weights(key, 'year')
+    if len(exitweightperday):
         return date_weight_source(exitweightperday, 'year')
     else:
         return default_layout_null()
@@ -632,12 +614,10 @@ def weight_source_callback(n_clicks, df, start_date, end_date):
     [State("date-picker-range", "start_date"),
      State("date-picker-range", "end_date")]
 )
-def weight_source_callback(n_clicks, df, start_date, end_date):
-    df = pd.read_json(df, orient="split")
-    if len(df):
-        df['month'] = df.Date.map(lambda x: x.strftime('%Y-%m'))
-        exitweightperday = df.groupby('month')['EXITWEIGHTMEAS'].sum().reset_index()
-        exitweightperday['EXITWEIGHTMEAS'] = np.round(exitweightperday.EXITWEIGHTMEAS / 1000)
+@memoize_figure('key')
+def weight_source_callback(n_clicks, key, start_date, end_date):
+    exitweightperday = production_weights(key, 'month')
+    if len(exitweightperday):
         return date_weight_source(exitweightperday, 'month')
     else:
         return default_layout_null()
@@ -650,50 +630,47 @@ def weight_source_callback(n_clicks, df, start_date, end_date):
     [State("date-picker-range", "start_date"),
      State("date-picker-range", "end_date")]
 )
-def weight_source_callback(n_clicks, df, start_date, end_date):
-    df = pd.read_json(df, orient="split")
-    if len(df):
-        df['Day'] = df.Date.dt.date
-        exitweightperday = df.groupby('Day')['EXITWEIGHTMEAS'].sum().reset_index()
-        exitweightperday['EXITWEIGHTMEAS'] = np.round(exitweightperday.EXITWEIGHTMEAS / 1000)
+@memoize_figure('key')
+def weight_source_callback(n_clicks, key, start_date, end_date):
+    exitweightperday = production_weights(key, 'day').rename(columns={'day': 'Day'})
+    if len(exitweightperday):
         return date_weight_source(exitweightperday, 'Day')
     else:
         return default_layout_null()
 
 
-# update bar chart figure df updates
+# coil timeline of the picked dates, or of the zoomed window within them
 @app.callback(
     [Output("coil_gait_chart", "figure"),
      Output('Tracking-Text', 'children'), ],
-    [Input("tracking-date-picker-single", "date"), Input('submit-button', 'n_clicks'), Input("time_df", "children")]
+    [Input("tracking-date-range", "start_date"), Input("tracking-date-range", "end_date"),
+     Input("coil_gait_chart", "relayoutData"), Input('submit-button', 'n_clicks'), Input("time_df", "children")]
 )
-def coil_Tracking_callback(date, _, df):
-    if date is not None:
-        df = get_coil_tracking()
-        df1 = df[df["Date"] == date]
-        if len(df1):
-            color_range = []
-            for i in df1[:]:
-                import random
-                r = lambda: random.randint(0, 255)
-                color = '#{:02x}{:02x}{:02x}'.format(r(), r(), r())
-                color_range.append(color)
-            chart = ff.create_gantt(df1, colors=color_range, title='coil Production Tracking',
-                                    show_colorbar=True, bar_width=0.5, showgrid_x=True, showgrid_y=True)
-
-            fig = go.Figure(chart)
-            return fig, "Showing Chart For {}".format(date)
-        else:
-            figure = {
-                'data': [],
-
-                'layout': {
-                    'title': 'No Data Found',
+def coil_Tracking_callback(start_date, end_date, relayout_data, _, df):
+    if start_date is None or end_date is None:
+        raise PreventUpdate
+    # picked dates are inclusive
+    start = pd.Timestamp(start_date).normalize()
+    end = pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1)
+    if [t['prop_id'] for t in dash.callback_context.triggered] == ['coil_gait_chart.relayoutData']:
+        x_range = relayout_range(relayout_data)
+        if x_range is not None:
+            start, end = (pd.Timestamp(bound) for bound in x_range)
+        elif not relayout_data or not relayout_data.get('xaxis.autorange'):
+            raise PreventUpdate
+    return coil_timeline(start, end, df, '{}-{}'.format(start_date, end_date))
 
-                }
 
-            }
-            return figure, "NO Data found for Date {}".format(date)
+@memoize_figure('start', 'end', 'df', 'uirevision')
+def coil_timeline(start, end, df, uirevision):
+    figure, view, coils = timeline_figure(get_coil_tracking_index(), start, end, 'coil Production Tracking',
+                                          uirevision)
+    window = "{:%Y-%m-%d %H:%M} to {:%Y-%m-%d %H:%M}".format(start, end)
+    if not coils:
+        return figure, "NO Data found from {}".format(window)
+    if view == 'coil':
+        return figure, "Showing {} coils from {}".format(coils, window)
+    return figure, "Showing {} coils per {} from {}, zoom in for single coils".format(coils, view, window)
 
 
 # update pie chart figure df updates
@@ -703,8 +680,9 @@ def coil_Tracking_callback(date, _, df):
     [State("date-picker-range", "start_date"),
      State("date-picker-range", "end_date")]
 )
-def width_source_callback(df, n_clicks, start_date, end_date):
-    df = pd.read_json(df, orient="split")
+@memoize_figure('key')
+def width_source_callback(key, n_clicks, start_date, end_date):
+    df = get_frame(key)
     if len(df) > 0:
         width_stats = df.groupby('ENTRYWIDTH')['EXITTHICK'].describe().reset_index()
         return width_source(width_stats)
@@ -712,22 +690,29 @@ def width_source_callback(df, n_clicks, start_date, end_date):
         return default_layout_null()
 
 
-# update pie chart figure df updates
+# thickness curve of the whole frame, sent once per df update; the slider
+# filters it in the browser
 @app.callback(
-    Output("thickness_leads", "figure"),
-    [Input("thicknessslider", "value"),
-     Input("time_df", "children"), Input('submit-button', 'n_clicks')],
+    Output("thickness_curve", "data"),
+    [Input("time_df", "children"), Input('submit-button', 'n_clicks')],
     [State("date-picker-range", "start_date"),
      State("date-picker-range", "end_date")]
 )
-def thickness_source_callback(value, df, n_clicks, start_date, end_date):
-    df = pd.read_json(df, orient="split")
+@memoize_figure('key')
+def thickness_source_callback(key, n_clicks, start_date, end_date):
+    df = get_frame(key)
     if len(df) > 0:
-        thickness_stats = df.groupby('EXITTHICK')['EXITWEIGHTMEAS'].describe().reset_index()
-        thickness_stats = thickness_stats[thickness_stats['EXITTHICK'] <= value[1]]
+        thickness_stats = df.groupby('EXITTHICK')['EXITWEIGHTMEAS'].count().rename('count').reset_index()
         return thickness_source(thickness_stats)
     else:
-        return default_layout_null()
+        return None
+
+
+app.clientside_callback(
+    ClientsideFunction(namespace='ui', function_name='thickness'),
+    Output("thickness_leads", "figure"),
+    [Input("thicknessslider", "value"), Input("thickness_curve", "data")],
+)
 
 
 # update table based on drop down value and df updates
@@ -737,8 +722,9 @@ def thickness_source_callback(value, df, n_clicks, start_date, end_date):
     [State("date-picker-range", "start_date"),
      State("date-picker-range", "end_date")],
 )
-def aleads_table_callback(df, n_clicks, start_date, end_date):
-    df = pd.read_json(df, orient="split")
+@memoize_figure('key')
+def aleads_table_callback(key, n_clicks, start_date, end_date):
+    df = get_frame(key)
     if len(df) > 0:
         df = df.groupby('ALLOYCODE')['EXITTHICK'].describe()
         df = df.reset_index().rename(
@@ -787,8 +773,9 @@ def aleads_table_callback(df, n_clicks, start_date, end_date):
     [State("date-picker-range", "start_date"),
      State("date-picker-range", "end_date")],
 )
-def bleads_table_callback(df, n_clicks, start_date, end_date):
-    df = pd.read_json(df, orient="split")
+@memoize_figure('key')
+def bleads_table_callback(key, n_clicks, start_date, end_date):
+    df = get_frame(key)
     if len(df) > 0:
         df = df.groupby('ENTRYWIDTH')['EXITTHICK'].describe()
         df = df.reset_index().rename(
@@ -838,8 +825,9 @@ def bleads_table_callback(df, n_clicks, start_date, end_date):
     [State("date-picker-range", "start_date"),
      State("date-picker-range", "end_date")],
 )
-def cleads_table_callback(df, n_clicks, start_date, end_date):
-    df = pd.read_json(df, orient="split")
+@memoize_figure('key')
+def cleads_table_callback(key, n_clicks, start_date, end_date):
+    df = get_frame(key)
     if len(df) > 0:
         df = df.groupby('EXITTHICK')['EXITWEIGHTMEAS'].describe()
         df = df.reset_index().rename(
@@ -1,21 +1,18 @@
-import json
 import dash_core_components as dcc
 import dash_html_components as html
-import pandas as pd
-import plotly.graph_objs as go
-from dash.dependencies import Input, Output
+from dash.dependencies import ClientsideFunction, Input, Output, State
+from dash.exceptions import PreventUpdate
 from telegram_definition_L1 import *
 from app import app, dbc
-from datetime import datetime as dt
-from datamanager import get_segment_data
+from datamanager import get_segment_points
+from traces import item_options, point_figure, time_layout
 
 
 def get_dataframe():
-    """Retrieve the dataframe from Redis
-    This dataframe is periodically updated through the redis task
+    """Measuring point frames of the rings, or of the current export when
+    there are none, shared by every callback and session
     """
-    jsonified_df = get_segment_data()
-    return json.loads(jsonified_df)
+    return get_segment_points()
 
 
 first_card = dbc.Card(
@@ -53,8 +50,11 @@ first_card = dbc.Card(
 def serve_layout():
     return html.Div([
 
-        # Interval
-        dcc.Interval(interval=30 * 1000, id="interval_seg"),
+        # data version pushed by the server (push.py), polled in the browser
+        dcc.Interval(interval=500, id="interval_seg"),
+        dcc.Store(id='segment_version'),
+        # newest segment the plot holds, per session
+        dcc.Store(id='segment_cursor'),
         # Cards
         dbc.Row(
             [
@@ -64,176 +64,46 @@ def serve_layout():
     ])
 
 
+# line dash of the traces of measuring points 00 to 10
+POINT_DASH = ['solid', 'dash', 'solid', 'dash', 'solid', 'dash', 'solid', 'dash', 'solid', 'dot', 'solid']
+
+
+app.clientside_callback(
+    ClientsideFunction(namespace='push', function_name='segment'),
+    Output('segment_version', 'data'),
+    [Input("interval_seg", "n_intervals")],
+    [State('segment_version', 'data')])
+
+
+# the columns the frames hold, which split multi-valued fields when they
+# come from the rings
 @app.callback(
-    Output('segment_plot', 'figure'),
-    [Input('item-list', 'value'), Input("interval_seg", "n_intervals")])
-def display_value(selected_dropdown_value, _):
-    dataset = get_dataframe()
-    data = json.loads(dataset)
-    MP_00 = pd.read_json(data['df_00'], orient='split')
-    MP_01 = pd.read_json(data['df_01'], orient='split')
-    MP_02 = pd.read_json(data['df_02'], orient='split')
-    MP_03 = pd.read_json(data['df_03'], orient='split')
-    MP_04 = pd.read_json(data['df_04'], orient='split')
-    MP_05 = pd.read_json(data['df_05'], orient='split')
-    MP_06 = pd.read_json(data['df_06'], orient='split')
-    MP_07 = pd.read_json(data['df_07'], orient='split')
-    MP_08 = pd.read_json(data['df_08'], orient='split')
-    MP_09 = pd.read_json(data['df_09'], orient='split')
-    MP_10 = pd.read_json(data['df_10'], orient='split')
-    # MP_01.to_csv('data', sep='\t', encoding='utf-8')
-    # index = pd.to_datetime(MP_02['time'], format="%Y-%m-%d %H:%M:%S.%f")
-    trace0 = []
-    trace1 = []
-    trace2 = []
-    trace3 = []
-    trace4 = []
-    trace5 = []
-    trace6 = []
-    trace7 = []
-    trace8 = []
-    trace9 = []
-    trace10 = []
-
-    for item in selected_dropdown_value:
-        # Create and style traces
-        trace0.append(go.Scatter(
-            x=MP_00['time'],
-            y=MP_00[item],
-            name=item + ' at MP 00',
-            text=MP_00[item],
-            line=dict(
-                # color=('rgb(205, 12, 24)'),
-                dash='solid',
-                width=2)
-        ))
-        trace1.append(go.Scatter(
-            x=MP_01['time'],
-            y=MP_01[item],
-            name=item + ' at MP 01',
-            text=MP_01[item],
-            line=dict(
-                # color=('rgb(22, 96, 167)'),
-                dash='dash',
-                width=2, )
-        ))
-        trace2.append(go.Scatter(
-            x=MP_02['time'],
-            y=MP_02[item],
-            name=item + 'at MP 02',
-            text=MP_02[item],
-            line=dict(
-                # color=('rgb(205, 12, 24)'),
-                width=2,
-                dash='solid')  # dash options include 'dash', 'dot', and 'dashdot'
-        ))
-        trace3.append(go.Scatter(
-            x=MP_03['time'],
-            y=MP_03[item],
-            name=item + ' at MP 03',
-            text=MP_03[item],
-            line=dict(
-                # color=('rgb(22, 96, 167)'),
-                width=2,
-                dash='dash')
-        ))
-        trace4.append(go.Scatter(
-            x=MP_04['time'],
-            y=MP_04[item],
-            name=item + ' at MP 04',
-            text=MP_04[item],
-            line=dict(
-                # color=('rgb(205, 12, 24)'),
-                width=2,
-                dash='solid')
-        ))
-        trace5.append(go.Scatter(
-            x=MP_05['time'],
-            y=MP_05[item],
-            name=item + ' at MP 05',
-            text=MP_05[item],
-            line=dict(
-                # color=('rgb(22, 96, 167)'),
-                width=2,
-                dash='dash')
-        ))
-        trace6.append(go.Scatter(
-            x=MP_06['time'],
-            y=MP_06[item],
-            name=item + ' at MP 06',
-            text=MP_06[item],
-            line=dict(
-                #  color=('rgb(22, 96, 167)'),
-                width=2,
-                dash='solid')
-        ))
-        trace7.append(go.Scatter(
-            x=MP_07['time'],
-            y=MP_07[item],
-            name=item + ' at MP 07',
-            text=MP_07[item],
-            line=dict(
-                # color=('rgb(22, 96, 167)'),
-                width=2,
-                dash='dash')
-        ))
-        trace8.append(go.Scatter(
-            x=MP_08['time'],
-            y=MP_08[item],
-            name=item + ' at MP 08',
-            text=MP_08[item],
-            line=dict(
-                # color=('rgb(22, 96, 167)'),
-                width=2,
-                dash='solid')
-        ))
-        trace9.append(go.Scatter(
-            x=MP_09['time'],
-            y=MP_09[item],
-            name=item + ' at MP 09',
-            text=MP_09[item],
-            line=dict(
-                #  color=('rgb(22, 96, 167)'),
-                width=2,
-                dash='dot')
-        ))
-        trace10.append(go.Scatter(
-            x=MP_10['time'],
-            y=MP_10[item],
-            name=item + ' at MP 10',
-            text=MP_10[item],
-            line=dict(
-                #  color=('rgb(22, 96, 167)'),
-                width=2,
-                dash='solid')
-        ))
-    traces = [trace0, trace1, trace2, trace3, trace4, trace5, trace6, trace7, trace8, trace9, trace10]
-    data = [val for sublist in traces for val in sublist]
-
-    # Edit the layout
-    layout = dict(title='Segment data at measurement points "{}"'.format(selected_dropdown_value),
-                  xaxis={"title": "Date Time",
-                         'rangeselector': {'buttons': list([
-                             {'count': 1, 'label': '1M', 'step': 'minute', 'stepmode': 'backward'},
-                             {'count': 10, 'label': '6M', 'step': 'minute', 'stepmode': 'backward'},
-                             {'step': 'all'}
-                         ])}, 'rangeslider': {'visible': True}, 'type': 'date'},
-                  # yaxis=dict(title='Values'),
-                  margin={'l': 40, 'b': 40, 't': 10, 'r': 10},
-                  legend={'x': 0, 'y': 1},
-                  hovermode='closest'
-                  )
-
-    # Plot and embed
-    fig = dict(data=data, layout=layout)
-    return fig
+    Output('item-list', 'options'),
+    [Input('segment_version', 'data')],
+    [State('item-list', 'options')])
+def item_list_options(_, options):
+    current = item_options(get_dataframe(), range(len(POINT_DASH)), [teltype_M21[i][0] for i in range(0, 13)])
+    if current == options:
+        raise PreventUpdate
+    return current
 
 
 @app.callback(
+    [Output('segment_plot', 'figure'), Output('segment_plot', 'extendData'), Output('segment_cursor', 'data')],
+    [Input('item-list', 'value'), Input('segment_version', 'data'), Input('segment_plot', 'relayoutData')],
+    [State('segment_cursor', 'data')])
+def display_value(selected_dropdown_value, _, relayout_data, cursor):
+    # zooming or dragging the rangeslider re-queries the visible range at
+    # full resolution, refresh ticks only stream the new segments
+    labels = {point: ' at MP {:02d}'.format(point) for point in range(len(POINT_DASH))}
+    layout = time_layout('Segment data at measurement points "{}"'.format(selected_dropdown_value),
+                         uirevision='segment_plot')
+    return point_figure(get_dataframe(), labels, selected_dropdown_value, layout, 'segment_version.data', cursor,
+                        relayout_data, dashes=dict(enumerate(POINT_DASH)))
+
+
+app.clientside_callback(
+    ClientsideFunction(namespace='ui', function_name='status'),
     Output("status_seg", "children"),
-    [Input('item-list', 'value'), Input("interval_seg", "n_intervals")],
+    [Input('item-list', 'value'), Input('segment_version', 'data')],
 )
-def update_status(value, _):
-    time_now = str(dt.now())
-    data_last_updated = dt.strptime(time_now[:19], "%Y-%m-%d %H:%M:%S")
-    return "Data last updated at {} UTC".format(data_last_updated)
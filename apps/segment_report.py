@@ -1,23 +1,20 @@
-import json
-
 import dash_core_components as dcc
 import dash_html_components as html
 import dash_table
-import pandas as pd
 import plotly.graph_objs as go
 from dash.dependencies import Input, Output
 from plotly.subplots import make_subplots
 
 from app import app, dbc
-from datamanager import get_segment_data
+from datamanager import get_segment_points
+from traces import point_traces
 
 
 def get_dataframe():
-    """Retrieve the dataframe from Redis
-    This dataframe is periodically updated through the redis task
+    """Measuring point frames of the rings, or of the current export when
+    there are none, shared by every callback and session
     """
-    jsonified_df = get_segment_data()
-    return json.loads(jsonified_df)
+    return get_segment_points()
 
 
 def generate_front_page():
@@ -35,9 +32,8 @@ def generate_front_page():
 
 
 def generate_table():
-    dataset = get_dataframe()
-    data = json.loads(dataset)
-    MP = pd.read_json(data['df_00'], orient='split')
+    points = get_dataframe()
+    MP = points[0]
     col = ["time",
            "SegId",
            "SetupId",
@@ -155,89 +151,12 @@ def generate_curves(
         width=1400,
 ):
     fig = make_subplots(rows=6, cols=2, shared_yaxes=True)
-    dataset = get_dataframe()
-    data = json.loads(dataset)
-    MP_00 = pd.read_json(data['df_00'], orient='split')
-    MP_01 = pd.read_json(data['df_01'], orient='split')
-    MP_02 = pd.read_json(data['df_02'], orient='split')
-    MP_03 = pd.read_json(data['df_03'], orient='split')
-    MP_04 = pd.read_json(data['df_04'], orient='split')
-    MP_05 = pd.read_json(data['df_05'], orient='split')
-    MP_06 = pd.read_json(data['df_06'], orient='split')
-    MP_07 = pd.read_json(data['df_07'], orient='split')
-    MP_08 = pd.read_json(data['df_08'], orient='split')
-    MP_09 = pd.read_json(data['df_09'], orient='split')
-    MP_10 = pd.read_json(data['df_10'], orient='split')
-    # MP_01.to_csv('data', sep='\t', encoding='utf-8')
-    # index = pd.to_datetime(MP_02['time'], format="%Y-%m-%d %H:%M:%S.%f")
     item = "VolSeg"
-    # Create and style traces
-    fig.add_trace(go.Scatter(
-        x=MP_00['time'],
-        y=MP_00[item],
-        name=' At MP 00',
-        text=MP_00[item]
-    ), row=1, col=1)
-    fig.add_trace(go.Scatter(
-        x=MP_01['time'],
-        y=MP_01[item],
-        name=' At MP 01',
-        text=MP_01[item]
-    ), row=1, col=2)
-    fig.add_trace(go.Scatter(
-        x=MP_02['time'],
-        y=MP_02[item],
-        name='At MP 02',
-        text=MP_02[item]
-    ), row=2, col=1)
-    fig.add_trace(go.Scatter(
-        x=MP_03['time'],
-        y=MP_03[item],
-        name=' At MP 03',
-        text=MP_03[item]
-    ), row=2, col=2)
-    fig.add_trace(go.Scatter(
-        x=MP_04['time'],
-        y=MP_04[item],
-        name=' At MP 04',
-        text=MP_04[item]
-    ), row=3, col=1)
-    fig.add_trace(go.Scatter(
-        x=MP_05['time'],
-        y=MP_05[item],
-        name=' At MP 05',
-        text=MP_05[item]
-    ), row=3, col=2)
-    fig.add_trace(go.Scatter(
-        x=MP_06['time'],
-        y=MP_06[item],
-        name=' At MP 06',
-        text=MP_06[item],
-    ), row=4, col=1)
-    fig.add_trace(go.Scatter(
-        x=MP_07['time'],
-        y=MP_07[item],
-        name=' At MP 07',
-        text=MP_07[item]
-    ), row=4, col=2)
-    fig.add_trace(go.Scatter(
-        x=MP_08['time'],
-        y=MP_08[item],
-        name=' At MP 08',
-        text=MP_08[item]
-    ), row=5, col=1)
-    fig.add_trace(go.Scatter(
-        x=MP_09['time'],
-        y=MP_09[item],
-        name=' At MP 09',
-        text=MP_09[item]
-    ), row=5, col=2)
-    fig.add_trace(go.Scatter(
-        x=MP_10['time'],
-        y=MP_10[item],
-        name=' At MP 10',
-        text=MP_10[item]
-    ), row=6, col=1)
+    # Create and style traces, one measuring point per subplot
+    labels = {point: ' At MP {:02d}'.format(point) for point in range(11)}
+    traces = point_traces(get_dataframe(), labels, [item])
+    for point, trace in enumerate(traces):
+        fig.add_trace(trace, row=point // 2 + 1, col=point % 2 + 1)
 
     # #############################################################################
     # IMPORTANT | Set the global font properties of the figure
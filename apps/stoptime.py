@@ -2,16 +2,16 @@
 
 from datetime import datetime as dt
 
+import dash
 import dash_core_components as dcc
 import dash_html_components as html
 import dash_table
 import numpy as np
-import pandas as pd
-from dash.dependencies import Input, Output, State
+from dash.dependencies import ClientsideFunction, Input, Output, State
 from plotly import graph_objs as go
 from dash.exceptions import PreventUpdate
 from app import app, dbc
-from datamanager import get_stop_time
+from datamanager import get_stop_time, register_query, query_frame, get_frame, is_current, memoize_figure
 import random
 
 
@@ -54,6 +54,23 @@ def default_layout_null():
     return html.Div(style={'display': 'none'})
 
 
+# delay frame behind the parttime_df key
+@register_query('stop_time')
+def stop_time_frame(start_date, end_date):
+    if start_date is None or end_date is None:
+        return get_stop_time()
+    return get_stop_time(start_date, end_date)
+
+
+# delay totals of the PL, TCM and PLTCM plants (PLANT 1, 2 and 3) from a single
+# grouping of the stop time frame; plants without delays count as 0
+def plant_indicators(df):
+    if len(df) == 0:
+        return 0, 0, 0
+    df_stats = df.groupby('PLANT')['DURATION'].sum().reindex([1, 2, 3], fill_value=0)
+    return np.ceil(np.abs(df_stats[1])), np.ceil(df_stats[2]), np.ceil(df_stats[3])
+
+
 """ Layout Elements"""
 """ Top Element """
 alert = dbc.Alert(
@@ -198,8 +215,9 @@ def serve_layout():
         [
             # ALeart
             alert,
-            # Interval
-            dcc.Interval(interval=300 * 1000, id="interval_stop"),
+            # data version pushed by the server (push.py), polled in the browser
+            dcc.Interval(interval=500, id="interval_stop"),
+            dcc.Store(id='stop_time_version'),
 
             # indicators row div
             indicators,
@@ -214,83 +232,55 @@ def serve_layout():
     )
 
 
-@app.callback(
-    Output("status_stop", "children"),
+app.clientside_callback(
+    ClientsideFunction(namespace='push', function_name='stop_time'),
+    Output('stop_time_version', 'data'),
     [Input("interval_stop", "n_intervals")],
-)
-def update_status(_):
-    time_now = str(dt.now())
-    data_last_updated = dt.strptime(time_now[:19], "%Y-%m-%d %H:%M:%S")
-    return "Data last updated at {} UTC".format(data_last_updated)
-
-
-# update hidden div data block
-@app.callback(
-    Output('parttime_df', 'children'),
-    [Input("interval_stop", "n_intervals"), Input('submit-button', 'n_clicks')],
-    [State("date-range", "start_date"),
-     State("date-range", "end_date")]
-)
-def store_data(_, n_clicks, start_date, end_date):
-    df = get_stop_time()
-    if start_date and end_date is not None:
-        if n_clicks > 0:
-            start = pd.to_datetime(start_date)
-            end = pd.to_datetime(end_date)
-            df1 = df.loc[(df['DATE'] > start) & (df['DATE'] <= end)]
-            if df1.empty:
-                raise PreventUpdate
-            return df1.to_json(orient="split")
-    else:
-        return df.to_json(orient="split")
+    [State('stop_time_version', 'data')])
 
 
-# updates left indicator based on df updates
-@app.callback(
-    Output("left_PL_indicator", "children"),
-    [Input("parttime_df", "children"), Input('submit-button', 'n_clicks')],
-    [State("date-range", "start_date"),
-     State("date-range", "end_date")]
+app.clientside_callback(
+    ClientsideFunction(namespace='ui', function_name='status'),
+    Output("status_stop", "children"),
+    [Input('stop_time_version', 'data')],
 )
-def left_leads_indicator_callback(df, n_clicks, start_date, end_date):
-    df = pd.read_json(df, orient="split")
-    if len(df) > 0:
-        df_stats = df.groupby('PLANT')['DURATION'].sum()
-        return np.ceil(np.abs(df_stats[1]))
-    else:
-        return 0
 
 
-# updates middle  indicator based on df updates
+# update hidden div data block
 @app.callback(
-    Output("middle_TCM_indicator", "children"),
-    [Input("parttime_df", "children"), Input('submit-button', 'n_clicks')],
+    Output('parttime_df', 'children'),
+    [Input('stop_time_version', 'data'), Input('submit-button', 'n_clicks')],
     [State("date-range", "start_date"),
-     State("date-range", "end_date")]
+     State("date-range", "end_date"),
+     State('parttime_df', 'children')]
 )
-def left_leads_indicator_callback(df, n_clicks, start_date, end_date):
-    df = pd.read_json(df, orient="split")
-    if len(df) > 0:
-        df_stats = df.groupby('PLANT')['DURATION'].sum()
-        return np.ceil(df_stats[2])
+def store_data(_, n_clicks, start_date, end_date, key):
+    # a data refresh for the version the page already shows would only make
+    # the dependent callbacks redraw identical figures
+    refresh = [t['prop_id'] for t in dash.callback_context.triggered] == ['stop_time_version.data']
+    if refresh and is_current(key):
+        raise PreventUpdate
+    if start_date and end_date is not None and n_clicks > 0:
+        key = query_frame('stop_time', start_date, end_date)
+        if get_frame(key).empty:
+            raise PreventUpdate
+        return key
     else:
-        return 0
+        return query_frame('stop_time')
 
 
-# updates Right  indicator based on df updates
+# updates the PL, TCM and PLTCM indicators based on df updates
 @app.callback(
-    Output("right_PLTCM_indicator", "children"),
+    [Output("left_PL_indicator", "children"),
+     Output("middle_TCM_indicator", "children"),
+     Output("right_PLTCM_indicator", "children")],
     [Input("parttime_df", "children"), Input('submit-button', 'n_clicks')],
     [State("date-range", "start_date"),
      State("date-range", "end_date")]
 )
-def left_leads_indicator_callback(df, n_clicks, start_date, end_date):
-    df = pd.read_json(df, orient="split")
-    if len(df) > 0:
-        df_stats = df.groupby('PLANT')['DURATION'].sum()
-        return np.ceil(df_stats[3])
-    else:
-        return 0
+@memoize_figure('key')
+def leads_indicator_callback(key, n_clicks, start_date, end_date):
+    return plant_indicators(get_frame(key))
 
 
 # update table based on drop down value and df updates
@@ -300,8 +290,9 @@ def left_leads_indicator_callback(df, n_clicks, start_date, end_date):
     [State("date-range", "start_date"),
      State("date-range", "end_date")]
 )
-def leads_table_callback(df, value, n_clicks, start_date, end_date):
-    df = pd.read_json(df, orient="split")
+@memoize_figure('value', 'key')
+def leads_table_callback(key, value, n_clicks, start_date, end_date):
+    df = get_frame(key)
     if len(df) > 0:
         df = df.groupby('DATE')['DURATION'].describe().reset_index()
 
@@ -339,8 +330,9 @@ def leads_table_callback(df, value, n_clicks, start_date, end_date):
     [State("date-range", "start_date"),
      State("date-range", "end_date")]
 )
-def by_date_source_callback(df, n_clicks, start_date, end_date):
-    df = pd.read_json(df, orient="split")
+@memoize_figure('key')
+def by_date_source_callback(key, n_clicks, start_date, end_date):
+    df = get_frame(key)
     if len(df) > 0:
         df = df.groupby('YEAR')['DURATION'].describe().reset_index()
         figure = date_source(df, 'YEAR')
@@ -356,8 +348,9 @@ def by_date_source_callback(df, n_clicks, start_date, end_date):
     [State("date-range", "start_date"),
      State("date-range", "end_date")]
 )
-def by_date_source_callback(df, n_clicks, start_date, end_date):
-    df = pd.read_json(df, orient="split")
+@memoize_figure('key')
+def by_date_source_callback(key, n_clicks, start_date, end_date):
+    df = get_frame(key)
     if len(df) > 0:
         df = df.groupby('MONTH')['DURATION'].describe().reset_index()
         figure = date_source(df, 'MONTH')
@@ -373,8 +366,9 @@ def by_date_source_callback(df, n_clicks, start_date, end_date):
     [State("date-range", "start_date"),
      State("date-range", "end_date")]
 )
-def by_date_source_callback(df, n_clicks, start_date, end_date):
-    df = pd.read_json(df, orient="split")
+@memoize_figure('key')
+def by_date_source_callback(key, n_clicks, start_date, end_date):
+    df = get_frame(key)
     if len(df) > 0:
         df = df.groupby('HOUR')['DURATION'].describe().reset_index()
         figure = date_source(df, 'HOUR')
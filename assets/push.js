@@ -0,0 +1,73 @@
+/*
+ * Data versions pushed by the server on /events (see push.py), or polled
+ * from /versions while the server has no stream to spare.
+ *
+ * Every page holds a fast dcc.Interval whose clientside callback copies the
+ * version of its dataset into a dcc.Store; the server callbacks listen to
+ * that store, so they only run when the data really changed.
+ */
+if (!window.dash_clientside) {
+    window.dash_clientside = {};
+}
+
+(function () {
+    var versions = {};
+    var POLL_MS = 5000;
+    var RECONNECT_MS = 60000;
+
+    function poll() {
+        fetch('/versions', {credentials: 'same-origin'})
+            .then(function (response) {
+                return response.ok ? response.json() : null;
+            })
+            .then(function (data) {
+                if (data) {
+                    versions = data;
+                }
+            })
+            .catch(function () {});
+    }
+
+    function connect() {
+        // EventSource reconnects on its own after the retry delay, except
+        // when the server refused the stream
+        var source = new EventSource('/events');
+        source.addEventListener('versions', function (event) {
+            versions = JSON.parse(event.data);
+        });
+        source.onerror = function () {
+            if (source.readyState !== EventSource.CLOSED) {
+                return;
+            }
+            var timer = setInterval(poll, POLL_MS);
+            poll();
+            setTimeout(function () {
+                clearInterval(timer);
+                connect();
+            }, RECONNECT_MS);
+        };
+    }
+
+    if (window.EventSource) {
+        connect();
+    } else {
+        setInterval(poll, POLL_MS);
+    }
+
+    function watch(dataset) {
+        return function (n_intervals, current) {
+            var version = versions[dataset];
+            if (version === undefined || version === current) {
+                throw window.dash_clientside.PreventUpdate;
+            }
+            return version;
+        };
+    }
+
+    window.dash_clientside.push = {
+        production: watch('production'),
+        stop_time: watch('stop_time'),
+        segment: watch('segment'),
+        process: watch('process')
+    };
+})();
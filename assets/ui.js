@@ -0,0 +1,37 @@
+/*
+ * Clientside callbacks for state that never needs the server: the modal
+ * toggles, the "last updated" clocks and the thickness slider, which filters
+ * the thickness curve shipped once per frame (see production.py).
+ */
+if (!window.dash_clientside) {
+    window.dash_clientside = {};
+}
+
+window.dash_clientside.ui = {
+    toggle: function (n1, n2, is_open) {
+        if (n1 || n2) {
+            return !is_open;
+        }
+        return is_open;
+    },
+
+    status: function () {
+        var now = new Date().toISOString();
+        return 'Data last updated at ' + now.slice(0, 10) + ' ' + now.slice(11, 19) + ' UTC';
+    },
+
+    thickness: function (value, figure) {
+        if (!figure) {
+            return {data: [], layout: {}};
+        }
+        var trace = figure.data[0];
+        var x = [], y = [];
+        for (var i = 0; i < trace.x.length; i++) {
+            if (trace.x[i] <= value[1]) {
+                x.push(trace.x[i]);
+                y.push(trace.y[i]);
+            }
+        }
+        return {data: [Object.assign({}, trace, {x: x, y: y})], layout: figure.layout};
+    }
+};
@@ -0,0 +1,59 @@
+"""Build time and payload of the coil tracking Gantt chart.
+
+Compares the former figure (plotly.figure_factory.create_gantt with random
+colors, as coil_Tracking_callback built it) against
+gantt.gantt_figure's single Bar trace for 100, 1,000 and 10,000 coils. Build
+time covers constructing the figure and serializing it to the JSON the
+browser receives.
+
+    python benchmarks/bench_gantt.py
+"""
+import os
+import random
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.figure_factory as ff
+import plotly.graph_objs as go
+import plotly.io as pio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from gantt import gantt_figure  # noqa: E402
+
+WIDTHS = [1000.0, 1100.0, 1200.0, 1250.0, 1285.0, 1535.0]
+
+
+def coils(rows, rng):
+    start = np.datetime64('2020-03-13T00:00', 's') + np.sort(rng.integers(0, 86400, rows))
+    return pd.DataFrame({
+        'Task': ['C{:09d}'.format(i) for i in range(rows)],
+        'Start': start.astype('datetime64[us]'),
+        'Finish': (start + rng.integers(300, 1800, rows)).astype('datetime64[us]'),
+        'Resource': rng.choice(WIDTHS, rows),
+    })
+
+
+def former(frame):
+    color_range = ['#{:02x}{:02x}{:02x}'.format(random.randint(0, 255), random.randint(0, 255),
+                                                 random.randint(0, 255)) for _ in frame]
+    chart = ff.create_gantt(frame, colors=color_range, title='coil Production Tracking',
+                            show_colorbar=True, bar_width=0.5, showgrid_x=True, showgrid_y=True)
+    return go.Figure(chart)
+
+
+def measure(build):
+    started = time.perf_counter()
+    payload = pio.to_json(build(), validate=False)
+    return len(payload), time.perf_counter() - started
+
+
+if __name__ == '__main__':
+    rng = np.random.default_rng(0)
+    print('{:>8} {:>24} {:>24}'.format('coils', 'create_gantt', 'gantt_figure'))
+    for rows in (100, 1000, 10000):
+        frame = coils(rows, rng)
+        results = [measure(lambda: former(frame)), measure(lambda: gantt_figure(frame, 'coil Production Tracking'))]
+        print('{:>8} '.format(rows) + ' '.join('{:>9.1f} KB {:>9.1f} ms'.format(size / 1024, seconds * 1000)
+                                             for size, seconds in results))
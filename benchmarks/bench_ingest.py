@@ -0,0 +1,72 @@
+"""Cost of a refresh that brings in new coils, for growing coil histories.
+
+The export in data/ is grown to each history length by ingesting copies of
+its coils shifted later in time. A refresh then does what a feed poll does:
+``datamanager.ingest()`` of 20 new coils (appending to the tables, merging
+the rollup, hashing the rows for the data version, carrying stored frames
+over), followed by the reads of the next page update, ``get_production()``
+and ``get_coil_tracking_index()``, which view the new tables and merge the
+new coils into the time index of the coil tracking frame. The full rebuild
+column is part of what every refresh did before: the daily rollup of the
+whole history, without the JSON parse.
+
+    python benchmarks/bench_ingest.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import datamanager  # noqa: E402
+from rollups import DailyRollup  # noqa: E402
+
+HISTORIES = (10000, 100000, 1000000)
+NEW_COILS = 20
+REFRESHES = 20
+
+
+def coils(source, rows, start):
+    """``rows`` coils copied from ``source``, ending a minute apart from ``start`` on."""
+    copies = source.iloc[[position % len(source) for position in range(rows)]].reset_index(drop=True)
+    ends = start + pd.to_timedelta(pd.RangeIndex(1, rows + 1), unit='min')
+    # the other times of a coil keep their distance to its end of rolling
+    shift = ends - pd.DatetimeIndex(copies['DTENDROLLING'])
+    for column in datamanager.TIMESTAMP_COLUMNS[datamanager.PRODUCTION_SOURCE]:
+        copies[column] = copies[column] + shift
+    return copies
+
+
+def refresh(grow):
+    """Seconds taken by the ingest, get_production() and get_coil_tracking_index() of one refresh."""
+    started = time.perf_counter()
+    grow(NEW_COILS)
+    ingested = time.perf_counter()
+    datamanager.get_production()
+    read = time.perf_counter()
+    datamanager.get_coil_tracking_index()
+    return ingested - started, read - ingested, time.perf_counter() - read
+
+
+if __name__ == '__main__':
+    source = datamanager._cached('source', datamanager.PRODUCTION_SOURCE, datamanager._read_frame)
+    state = {'coils': len(source), 'end': source['DTENDROLLING'].max()}
+
+    def grow(rows):
+        datamanager.ingest('production', coils(source, rows, state['end']))
+        state['end'] += pd.Timedelta(minutes=rows)
+        state['coils'] += rows
+
+    print('{:>10} {:>10} {:>12} {:>10} {:>14}'.format('history', 'ingest', 'production', 'index', 'full rebuild'))
+    for history in HISTORIES:
+        grow(history - state['coils'])
+        datamanager.get_coil_tracking_index()
+        # medians: the occasional doubling of the table buffers is amortized
+        ingest, production, index = np.median([refresh(grow) for _ in range(REFRESHES)], axis=0)
+        started = time.perf_counter()
+        DailyRollup.from_coils(datamanager.get_production())
+        full = time.perf_counter() - started
+        print('{:>10} {:>7.2f} ms {:>9.3f} ms {:>7.2f} ms {:>11.2f} ms'.format(
+            state['coils'], ingest * 1000, production * 1000, index * 1000, full * 1000))
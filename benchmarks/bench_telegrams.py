@@ -0,0 +1,47 @@
+"""Decode rate of raw L1 telegram streams.
+
+Builds a synthetic capture of the eleven measuring-point telegrams in a fixed
+rotation, as the L1 channels send them every segment, and a shuffled capture
+that forces the gather path, then decodes both with TelegramDecoder.
+
+    python benchmarks/bench_telegrams.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from telegram_decoder import MEASURING_POINTS, TelegramDecoder  # noqa: E402
+from telegram_definition_L1 import messageId  # noqa: E402
+
+
+def capture(decoder, segments, shuffle, rng):
+    frames = []
+    for segment in range(segments):
+        for name in MEASURING_POINTS:
+            dtype = decoder.dtypes[name]
+            body = np.zeros(1, dtype=dtype)
+            body['SegId'] = segment
+            body['TmSegStart'] = [2020, 6, 1, 8, 0, 0, 0, 0]
+            body['TmSegStart'][0, 5] = segment % 60
+            header = np.array([(int(messageId[name], 16), dtype.itemsize)], dtype=decoder.header)
+            frames.append(header.tobytes() + body.tobytes())
+    if shuffle:
+        rng.shuffle(frames)
+    return b''.join(frames)
+
+
+if __name__ == '__main__':
+    rng = np.random.default_rng(0)
+    decoder = TelegramDecoder()
+    for shuffle in (False, True):
+        buffer = capture(decoder, 20000, shuffle, rng)
+        started = time.perf_counter()
+        points = decoder.measuring_points(buffer)
+        elapsed = time.perf_counter() - started
+        telegrams = sum(len(p['SegId']) for p in points.values())
+        print('{:>9}: {} telegrams, {:.1f} MB in {:.3f} s ({:,.0f} telegrams/s)'.format(
+            'shuffled' if shuffle else 'rotation', telegrams, len(buffer) / 1e6, elapsed, telegrams / elapsed))
+        assert all(np.array_equal(p['SegId'], np.sort(p['SegId'])) or shuffle for p in points.values())
@@ -0,0 +1,58 @@
+"""Date range queries: boolean masks against binary search on sorted frames.
+
+Coil and delay tables of 10M synthetic rows are filtered to ranges of a
+day, a month and a year. The mask path compares every row, as
+production.filter_data and stoptime's store_data did; the slice path runs
+datamanager.time_slice on the frame sorted by its time column.
+
+    python benchmarks/bench_time_slice.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from datamanager import time_slice  # noqa: E402
+
+ROWS = 10000000
+RANGES = {'day': ('2019-06-01', '2019-06-02'), 'month': ('2019-06-01', '2019-07-01'),
+          'year': ('2019-01-01', '2020-01-01')}
+
+
+def table(column, rng):
+    # ten years of rows in time order, as the loaded frames are kept
+    times = np.datetime64('2015-01-01T00:00', 's') + np.sort(rng.integers(0, 10 * 365 * 86400, ROWS))
+    return pd.DataFrame({
+        column: times.astype('datetime64[us]'),
+        'WEIGHT': rng.uniform(5000, 25000, ROWS),
+        'CODE': rng.integers(0, 100, ROWS),
+    })
+
+
+def masked(frame, column, start_date, end_date):
+    start, end = pd.to_datetime(start_date), pd.to_datetime(end_date)
+    return frame.loc[(frame[column] > start) & (frame[column] <= end)]
+
+
+def timed(function, repeat=5):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - started) / repeat
+
+
+if __name__ == '__main__':
+    rng = np.random.default_rng(0)
+    print('{:>12} {:>6} {:>10} {:>10} {:>10}'.format('table', 'range', 'rows', 'mask', 'slice'))
+    for name, column in (('coils', 'DTENDROLLING'), ('delays', 'DATE')):
+        frame = table(column, rng)
+        for label, (start_date, end_date) in RANGES.items():
+            rows = len(time_slice(frame, column, start_date, end_date))
+            assert rows == len(masked(frame, column, start_date, end_date))
+            mask = timed(lambda: masked(frame, column, start_date, end_date))
+            sliced = timed(lambda: time_slice(frame, column, start_date, end_date))
+            print('{:>12} {:>6} {:>10} {:>8.2f}ms {:>8.3f}ms'.format(
+                name, label, rows, mask * 1000, sliced * 1000))
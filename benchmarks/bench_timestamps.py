@@ -0,0 +1,67 @@
+"""Timestamp normalization of a synthetic multi-year delay log.
+
+Compares the former get_stop_time() path (format-less pd.to_datetime and a
+per-row strftime for MONTH) with datamanager.normalize_timestamps() and
+add_calendar_columns().
+
+    python benchmarks/bench_timestamps.py [rows]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from datamanager import PLANT_TIME_FORMAT, normalize_timestamps, add_calendar_columns  # noqa: E402
+
+
+def delay_log(rows, years=5):
+    rng = np.random.default_rng(0)
+    start = np.datetime64('2016-01-01T00:00')
+    minutes = np.sort(rng.integers(0, years * 365 * 24 * 60, rows))
+    dtstart = pd.Series(start + minutes.astype('timedelta64[m]'))
+    dtend = dtstart + pd.to_timedelta(rng.integers(1, 90, rows), unit='m')
+    return pd.DataFrame({
+        'PLANT': rng.integers(1, 4, rows),
+        'DTSTART': dtstart.dt.strftime(PLANT_TIME_FORMAT),
+        'DTEND': dtend.dt.strftime(PLANT_TIME_FORMAT),
+        'DTSTORE': dtend.dt.strftime(PLANT_TIME_FORMAT),
+    })
+
+
+def former_path(frame):
+    frame['DURATION'] = np.abs(pd.to_datetime(frame['DTEND']) - pd.to_datetime(frame['DTSTART']))
+    frame['DURATION'] = frame['DURATION'] / np.timedelta64(1, 'm')
+    frame['DTSTORE'] = pd.to_datetime(frame['DTSTORE'])
+    frame['DATE'] = pd.to_datetime(frame.DTSTORE.dt.date)
+    frame['YEAR'] = frame.DTSTORE.dt.year
+    frame['MONTH'] = frame.DTSTORE.dt.date.map(lambda x: x.strftime('%Y-%m'))
+    frame['DAY'] = frame.DTSTORE.dt.day
+    frame['HOUR'] = frame.DTSTORE.dt.hour
+    return frame
+
+
+def normalized_path(frame):
+    normalize_timestamps(frame, dict.fromkeys(['DTSTART', 'DTEND', 'DTSTORE'], PLANT_TIME_FORMAT))
+    frame['DURATION'] = np.abs(frame['DTEND'] - frame['DTSTART']) / np.timedelta64(1, 'm')
+    return add_calendar_columns(frame, 'DTSTORE')
+
+
+def timed(function, frame):
+    started = time.perf_counter()
+    result = function(frame.copy())
+    return result, time.perf_counter() - started
+
+
+if __name__ == '__main__':
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    frame = delay_log(rows)
+    former, former_time = timed(former_path, frame)
+    normalized, normalized_time = timed(normalized_path, frame)
+    print('{} delays over 5 years'.format(rows))
+    print('former path     {:8.3f} s'.format(former_time))
+    print('normalized path {:8.3f} s ({:.1f}x)'.format(normalized_time, former_time / normalized_time))
+    print('rows the format-less parse put in another month: {:.1%}'.format(
+        (former['MONTH'] != normalized['MONTH']).mean()))
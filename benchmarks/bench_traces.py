@@ -0,0 +1,55 @@
+"""Payload size and build time of the measuring point figures.
+
+Compares the former figures (one full resolution SVG Scatter per signal and
+point, with a duplicated text array) against traces.point_traces for 1, 5
+and 20 selected signals over 11 points. Build time covers constructing the
+figure and serializing it to the JSON the browser receives; the browser's
+own drawing time is not measured here, it is what Scattergl addresses.
+
+    python benchmarks/bench_traces.py [segments per point]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objs as go
+import plotly.io as pio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from traces import point_traces  # noqa: E402
+
+
+def points(segments, signals, rng):
+    time_index = pd.date_range('2020-06-01', periods=segments, freq='s')
+    return {point: pd.DataFrame(dict({'time': time_index},
+                                     **{'S{:02d}'.format(i): rng.normal(size=segments).cumsum()
+                                        for i in range(signals)}))
+            for point in range(11)}
+
+
+def former(points, items):
+    return [go.Scatter(x=frame['time'], y=frame[item], name=item, text=frame[item])
+            for frame in points.values() for item in items]
+
+
+def measure(build):
+    started = time.perf_counter()
+    payload = pio.to_json(dict(data=build(), layout={}), validate=False)
+    return len(payload), time.perf_counter() - started
+
+
+if __name__ == '__main__':
+    segments = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    data = points(segments, 20, np.random.default_rng(0))
+    labels = {point: ' at MP {:02d}'.format(point) for point in range(11)}
+    print('{} segments per point'.format(segments))
+    print('{:>8} {:>22} {:>30}'.format('signals', 'former', 'point_traces'))
+    for signals in (1, 5, 20):
+        items = ['S{:02d}'.format(i) for i in range(signals)]
+        size, elapsed = measure(lambda: former(data, items))
+        traces = point_traces(data, labels, items)
+        new_size, new_elapsed = measure(lambda: point_traces(data, labels, items))
+        print('{:>8} {:>9.1f} MB {:>7.0f} ms {:>9.2f} MB {:>7.0f} ms {:>10}'.format(
+            signals, size / 1e6, elapsed * 1000, new_size / 1e6, new_elapsed * 1000, traces[0].type))
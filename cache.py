@@ -0,0 +1,422 @@
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+def sizeof(value):
+    """Estimate the memory held by a cached value in bytes."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sizeof(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(sizeof(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class LRUCache(object):
+    """Thread-safe least recently used mapping.
+
+    Entries are evicted oldest first once either ``max_entries`` or the
+    estimated ``max_bytes`` budget is exceeded. A single value larger than the
+    whole budget is still kept, so the most recent load is always served.
+    """
+
+    def __init__(self, max_entries=64, max_bytes=256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value, _ = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, size=None):
+        if size is None:
+            size = sizeof(value)
+        with self._lock:
+            if key in self._data:
+                self.bytes -= self._data.pop(key)[1]
+            self._data[key] = (value, size)
+            self.bytes += size
+            while len(self._data) > 1 and (len(self._data) > self.max_entries or self.bytes > self.max_bytes):
+                _, (_, evicted) = self._data.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+        return value
+
+    def pop(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            value, size = self._data.pop(key)
+            self.bytes -= size
+            return value
+
+    def keys(self):
+        with self._lock:
+            return list(self._data)
+
+    def discard(self, predicate):
+        """Drop every entry whose key satisfies ``predicate``."""
+        with self._lock:
+            for key in [k for k in self._data if predicate(k)]:
+                self.bytes -= self._data.pop(key)[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._data),
+                'bytes': self.bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+class DiskCache(object):
+    """Pickled values in a directory, shared by every process that opens it.
+
+    Entries are written to a temporary file and renamed into place, so
+    readers never see a partial value. Once the directory holds more than
+    ``max_bytes`` the least recently read files are removed.
+    """
+
+    def __init__(self, directory, max_bytes=1024 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._written = 0
+        if not os.path.isdir(directory):
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(repr(key).encode('utf-8')).hexdigest() + '.pickle')
+
+    def __contains__(self, key):
+        return os.path.exists(self._path(key))
+
+    def get(self, key, default=None):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as entry:
+                stored_key, value = pickle.load(entry)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return default
+        if stored_key != key:
+            return default
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def put(self, key, payload):
+        """Store ``payload``, the pickled ``(key, value)`` pair built by ``dumps``."""
+        path = self._path(key)
+        temp = '{}.{}.{}.tmp'.format(path, os.getpid(), threading.get_ident())
+        try:
+            with open(temp, 'wb') as entry:
+                entry.write(payload)
+            os.replace(temp, path)
+        except OSError:
+            return
+        self._written += len(payload)
+        if self._written > self.max_bytes // 10:
+            self._written = 0
+            self.trim()
+
+    @staticmethod
+    def dumps(key, value):
+        return pickle.dumps((key, value), pickle.HIGHEST_PROTOCOL)
+
+    def trim(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+            total -= size
+
+
+class SqliteCache(object):
+    """Pickled values in a SQLite file shared by every process on the host.
+
+    Same interface as DiskCache. The file runs in WAL mode, so readers in
+    other workers are not blocked by a writer. Each thread, and each process
+    after a fork, opens its own connection. Read times are refreshed at most
+    once a minute and drive the eviction once the entries exceed
+    ``max_bytes``. Any SQLite error is treated as a miss.
+    """
+
+    def __init__(self, path, max_bytes=1024 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._written = 0
+        db = self._connection()
+        db.execute('CREATE TABLE IF NOT EXISTS entries '
+                   '(key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, used REAL NOT NULL)')
+        db.execute('CREATE INDEX IF NOT EXISTS entries_used ON entries (used)')
+
+    def _connection(self):
+        if getattr(self._local, 'pid', None) != os.getpid():
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db, self._local.pid = db, os.getpid()
+        return self._local.db
+
+    def __contains__(self, key):
+        try:
+            return self._connection().execute('SELECT 1 FROM entries WHERE key = ?', (repr(key),)).fetchone() is not None
+        except sqlite3.Error:
+            return False
+
+    def get(self, key, default=None):
+        try:
+            db = self._connection()
+            row = db.execute('SELECT value, used FROM entries WHERE key = ?', (repr(key),)).fetchone()
+            if row is None:
+                return default
+            now = time.time()
+            if now - row[1] > 60:
+                db.execute('UPDATE entries SET used = ? WHERE key = ?', (now, repr(key)))
+        except sqlite3.Error:
+            return default
+        try:
+            stored_key, value = pickle.loads(row[0])
+        except Exception:
+            return default
+        return value if stored_key == key else default
+
+    def put(self, key, payload):
+        """Store ``payload``, the pickled ``(key, value)`` pair built by ``DiskCache.dumps``."""
+        try:
+            self._connection().execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)',
+                                       (repr(key), sqlite3.Binary(payload), len(payload), time.time()))
+        except sqlite3.Error:
+            return
+        self._written += len(payload)
+        if self._written > self.max_bytes // 10:
+            self._written = 0
+            self.trim()
+
+    def trim(self):
+        try:
+            db = self._connection()
+            total = db.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            evicted = []
+            for key, size in db.execute('SELECT key, size FROM entries ORDER BY used'):
+                if total <= self.max_bytes:
+                    break
+                evicted.append((key,))
+                total -= size
+            db.executemany('DELETE FROM entries WHERE key = ?', evicted)
+        except sqlite3.Error:
+            pass
+
+
+class TieredCache(object):
+    """An LRUCache in front of an optional shared DiskCache or SqliteCache.
+
+    ``pop``, ``keys`` and ``discard`` only act on the local tier: entries of
+    the shared tier are never changed in place, they age out. Keys must
+    therefore name their data version. ``namespace`` is added to the keys of
+    the shared tier, which outlives the process, to name the code that
+    computed its entries as well.
+    """
+
+    def __init__(self, memory, disk=None, namespace=None):
+        self.memory = memory
+        self.disk = disk
+        self.namespace = namespace
+        self.disk_hits = 0
+
+    def __len__(self):
+        return len(self.memory)
+
+    def _shared_key(self, key):
+        return key if self.namespace is None else (self.namespace, key)
+
+    def __contains__(self, key):
+        return key in self.memory or (self.disk is not None and self._shared_key(key) in self.disk)
+
+    def get(self, key, default=None):
+        value = self.memory.get(key, default)
+        if value is default and self.disk is not None:
+            value = self.disk.get(self._shared_key(key), default)
+            if value is not default:
+                self.disk_hits += 1
+                self.memory.put(key, value)
+        return value
+
+    def put(self, key, value):
+        if self.disk is None:
+            return self.memory.put(key, value)
+        shared = self._shared_key(key)
+        try:
+            payload = DiskCache.dumps(shared, value)
+        except Exception:
+            return self.memory.put(key, value)
+        self.disk.put(shared, payload)
+        return self.memory.put(key, value, size=len(payload))
+
+    def pop(self, key, default=None):
+        return self.memory.pop(key, default)
+
+    def keys(self):
+        return self.memory.keys()
+
+    def discard(self, predicate):
+        self.memory.discard(predicate)
+
+    def clear(self):
+        self.memory.clear()
+
+    def stats(self):
+        stats = self.memory.stats()
+        stats['disk_hits'] = self.disk_hits
+        return stats
+
+
+class _Flight(object):
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """Runs concurrent calls for the same key once.
+
+    The first caller of a key leads and computes; callers arriving while it
+    runs follow, waiting for its result (or exception) instead of computing
+    it again. Nothing is kept once the leader returns, so keys only need to
+    be unique among the calls in flight.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+        self.leaders = 0
+        self.followers = 0
+
+    def do(self, key, function, *args, **kwargs):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.leaders += 1
+            else:
+                self.followers += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        try:
+            flight.value = function(*args, **kwargs)
+        except BaseException as error:
+            flight.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.value
+
+    def stats(self):
+        with self._lock:
+            calls = self.leaders + self.followers
+            return {'in_flight': len(self._flights), 'leaders': self.leaders, 'followers': self.followers,
+                    'coalesced': self.followers / calls if calls else 0.0}
+
+
+_MISSING = object()
+
+
+def memoize(cache, *arguments, flight=None, cacheable=None):
+    """Decorator caching the results of a function in ``cache``.
+
+    The key is the function and the values of the named ``arguments``; the
+    others (button clicks, states a callback does not read) are ignored.
+    Arguments must have stable reprs, e.g. frame keys carrying the data
+    version, so new data never hits an old entry. Results are shared and
+    must not be modified by the callers. With a SingleFlight, concurrent
+    misses of the same key are computed once. ``cacheable``, given the named
+    arguments as a dict, may refuse to cache a call, which is then computed
+    on its own.
+    """
+    def decorate(function):
+        signature = inspect.signature(function)
+        # pages reuse callback names, the line tells them apart
+        name = '{}.{}:{}'.format(function.__module__, function.__qualname__, function.__code__.co_firstlineno)
+
+        @functools.wraps(function)
+        def memoized(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            if cacheable is not None and not cacheable({a: bound.arguments.get(a) for a in arguments}):
+                return function(*args, **kwargs)
+            key = (name,) + tuple(repr(bound.arguments.get(argument)) for argument in arguments)
+            value = cache.get(key, _MISSING)
+            if value is _MISSING:
+
+                def compute():
+                    result = function(*args, **kwargs)
+                    cache.put(key, result)
+                    return result
+                value = compute() if flight is None else flight.do(key, compute)
+            return value
+        return memoized
+    return decorate
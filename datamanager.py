@@ -1,15 +1,325 @@
+import hashlib
+import io
+import os
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+
 import pandas as pd
 import numpy as np
 import json
 
+from cache import DiskCache, LRUCache, SingleFlight, SqliteCache, TieredCache, memoize
+from ingest import AppendOnlyTable, CsvFeed
+from ringbuffer import MeasuringPointStore
+from rollups import DailyRollup
+from timeindex import TimeIndex
 
-def get_coil_tracking():
-    with open('data/Prod_tab.json') as json_file:
-        data = json.load(json_file)
-    query_result = pd.DataFrame(data)
-    query_result["Start"] = pd.to_datetime(query_result["DTSTARTROLL"])
-    query_result['Date'] = pd.to_datetime(query_result.Start.dt.date)
-    query_result["Finish"] = pd.to_datetime(query_result["DTDEPARTURE"])
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+PRODUCTION_SOURCE = os.path.join(DATA_DIR, 'Prod_tab.json')
+STOP_TIME_SOURCE = os.path.join(DATA_DIR, 'stop_tab.json')
+SEGMENT_SOURCE = os.path.join(DATA_DIR, 'segmentdata.json')
+PROCESS_SOURCE = os.path.join(DATA_DIR, 'processdata.json')
+
+# Measuring point rings written by `python ringbuffer.py write` from the L1
+# telegram stream; while they exist the segment and process pages read them
+# instead of the JSON exports. Each point keeps RING_CAPACITY segments on
+# disk and pages read the last RING_WINDOW of them, so leave the capacity
+# well above the segments sent per window.
+RING_DIR = os.environ.get('DATAMANAGER_RING_DIR', os.path.join(DATA_DIR, 'rings'))
+RING_CAPACITY = int(os.environ.get('DATAMANAGER_RING_CAPACITY', 500000))
+RING_WINDOW = np.timedelta64(int(os.environ.get('DATAMANAGER_RING_WINDOW_MINUTES', 24 * 60)), 'm')
+
+# Timestamp columns of the table exports and their formats, parsed once when
+# an export is compacted. The L2 writes DTENDROLLING month first, every other
+# column day first, so the formats must never be guessed.
+PLANT_TIME_FORMAT = '%d.%m.%y %H:%M'
+TIMESTAMP_COLUMNS = {
+    PRODUCTION_SOURCE: {'DTSTARTROLL': PLANT_TIME_FORMAT,
+                        'DTDEPARTURE': PLANT_TIME_FORMAT,
+                        'DTENDROLLING': '%m.%d.%y %H:%M'},
+    STOP_TIME_SOURCE: {'DTSTART': PLANT_TIME_FORMAT,
+                       'DTEND': PLANT_TIME_FORMAT,
+                       'DTSTORE': PLANT_TIME_FORMAT},
+}
+# Compacted tables live next to their export, e.g. data/Prod_tab.npcols/<version>/.
+# Bump BUNDLE_FORMAT whenever the stored columns change meaning.
+BUNDLE_SUFFIX = '.npcols'
+BUNDLE_FORMAT = 2
+
+# Callbacks share the cached frames instead of copying them. With
+# copy-on-write, a frame derived from a shared one (a slice, a shallow copy)
+# gets its own data the moment it is modified, and the shared one never
+# changes. pandas 3 always works this way, pandas 2 needs the option.
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
+
+# Parsed sources and the frames derived from them are shared by every
+# callback of the process. Entries are keyed on the source file's mtime and
+# size, so a new export is picked up on the next call without a restart.
+CACHE_MAX_BYTES = int(os.environ.get('DATAMANAGER_CACHE_BYTES', 256 * 1024 * 1024))
+_cache = LRUCache(max_entries=32, max_bytes=CACHE_MAX_BYTES)
+_load_lock = threading.RLock()
+# Guards only the stamp bookkeeping of _load; it is never held while waiting
+# on a flight, so a load can finish while _load_lock's holder waits for it.
+_stamps_lock = threading.Lock()
+_stamps = {}
+_reloads = 0
+# Identical loads, queries and figures requested by several threads at once
+# (every screen refreshing on the same tick) are computed once; the keys
+# carry the data version like the cache keys do.
+_flight = SingleFlight()
+
+# Frames and figures are also kept in a SQLite file shared by the workers of
+# the host, so a worker serves what another one already computed. Parsed
+# sources are not: their column bundles are memory-mapped, and the OS
+# already shares those pages between processes. An empty
+# DATAMANAGER_SHARED_CACHE turns the shared tier off.
+SHARED_CACHE_PATH = os.environ.get('DATAMANAGER_SHARED_CACHE', os.path.join(DATA_DIR, 'shared_cache.sqlite'))
+SHARED_CACHE_MAX_BYTES = int(os.environ.get('DATAMANAGER_SHARED_CACHE_BYTES', 1024 * 1024 * 1024))
+# Its entries outlive deploys, so their keys also name the code that computed
+# them: a digest of the app's sources and of the pandas version, plus
+# SHARED_CACHE_FORMAT, to bump when entries change meaning without a source
+# change.
+SHARED_CACHE_FORMAT = 1
+
+
+def _code_version():
+    root = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.blake2b(pd.__version__.encode(), digest_size=8)
+    for directory in (root, os.path.join(root, 'apps')):
+        for name in sorted(os.listdir(directory)):
+            if name.endswith('.py'):
+                with open(os.path.join(directory, name), 'rb') as source:
+                    digest.update(name.encode('utf-8') + b'\0' + source.read())
+    return 'v{}-{}'.format(SHARED_CACHE_FORMAT, digest.hexdigest())
+
+
+SHARED_CACHE_NAMESPACE = _code_version()
+try:
+    _shared = SqliteCache(SHARED_CACHE_PATH, SHARED_CACHE_MAX_BYTES) if SHARED_CACHE_PATH else None
+except (OSError, sqlite3.Error) as error:
+    print('shared cache disabled: {}'.format(error))
+    _shared = None
+
+# Frames produced by the page callbacks. The browser only holds the opaque
+# key returned by query_frame(); the frames themselves stay on the server.
+FRAME_STORE_MAX_BYTES = int(os.environ.get('DATAMANAGER_FRAME_STORE_BYTES', 128 * 1024 * 1024))
+_frame_store = TieredCache(LRUCache(max_entries=128, max_bytes=FRAME_STORE_MAX_BYTES), _shared,
+                           SHARED_CACHE_NAMESPACE)
+_queries = {}
+
+# Figures and tables of the page callbacks, keyed on their frame key (which
+# carries the data version) and the inputs they read. Setting
+# DATAMANAGER_FIGURE_CACHE_DIR keeps their shared tier in that directory
+# instead of the SQLite file.
+FIGURE_CACHE_MAX_BYTES = int(os.environ.get('DATAMANAGER_FIGURE_CACHE_BYTES', 64 * 1024 * 1024))
+FIGURE_CACHE_DIR = os.environ.get('DATAMANAGER_FIGURE_CACHE_DIR')
+_figure_cache = TieredCache(LRUCache(max_entries=512, max_bytes=FIGURE_CACHE_MAX_BYTES),
+                            DiskCache(FIGURE_CACHE_DIR) if FIGURE_CACHE_DIR else _shared, SHARED_CACHE_NAMESPACE)
+
+
+def _source_stamp(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _cached(name, path, build):
+    """Return the value ``build(path)`` produced for the current file version."""
+    key = (name, path) + _source_stamp(path)
+    value = _cache.get(key)
+    if value is not None:
+        return value
+    return _flight.do(key, _load, key, name, path, build)
+
+
+def _load(key, name, path, build):
+    global _reloads
+    # a leader may have finished the same load just before this one started
+    if key in _cache:
+        return _cache.get(key)
+    value = build(path)
+    with _stamps_lock:
+        previous = _stamps.get((name, path))
+        if previous is not None and previous != key:
+            _reloads += 1
+            _cache.pop(previous)
+        _stamps[(name, path)] = key
+        return _cache.put(key, value)
+
+
+def _read_json(path):
+    with open(path) as json_file:
+        return json.load(json_file)
+
+
+def _parse_fixed_width(values, fmt):
+    """Parse zero padded text such as '22.09.16 09:19' with array arithmetic.
+
+    Only formats made of %d, %m, %y, %H, %M and literal characters are
+    handled. Returns None when ``fmt`` or any value does not fit, so the
+    caller can fall back to a strict ``pd.to_datetime``.
+    """
+    positions = {}
+    literals = []
+    width = 0
+    chars = iter(fmt)
+    for char in chars:
+        if char == '%':
+            code = next(chars, '')
+            if code not in 'dmyHM' or code in positions:
+                return None
+            positions[code] = width
+            width += 2
+        else:
+            literals.append((width, ord(char)))
+            width += 1
+    if len(positions) != 5:
+        return None
+    text = pd.Series(values)
+    nulls = text.isna().to_numpy()
+    text = text.where(~nulls, fmt.replace('%y', '70').replace('%d', '01').replace('%m', '01')
+                      .replace('%H', '00').replace('%M', '00')).to_numpy(dtype=str)
+    if text.dtype.itemsize != width * 4:
+        return None
+    codes = text.view(np.uint32).reshape(len(text), width).astype(np.int64)
+    for position, code in literals:
+        if (codes[:, position] != code).any():
+            return None
+    columns = sorted(p + offset for p in positions.values() for offset in (0, 1))
+    digits = codes - ord('0')
+    if ((digits[:, columns] < 0) | (digits[:, columns] > 9)).any():
+        return None
+    field = {code: digits[:, p] * 10 + digits[:, p + 1] for code, p in positions.items()}
+    year = field['y'] + np.where(field['y'] < 69, 2000, 1900)
+    month = (year - 1970) * 12 + field['m'] - 1
+    first = month.astype('datetime64[M]').astype('datetime64[D]')
+    days_in_month = ((month + 1).astype('datetime64[M]').astype('datetime64[D]') - first).astype(np.int64)
+    if ((field['m'] < 1) | (field['m'] > 12) | (field['d'] < 1) | (field['d'] > days_in_month)
+            | (field['H'] > 23) | (field['M'] > 59)).any():
+        return None
+    minutes = first.astype('datetime64[m]') + ((field['d'] - 1) * 1440 + field['H'] * 60 + field['M'])
+    stamps = minutes.astype('datetime64[ns]')
+    stamps[nulls] = np.datetime64('NaT')
+    return stamps
+
+
+def normalize_timestamps(frame, formats):
+    """Parse the text columns named in ``formats`` with their fixed strftime format."""
+    for column, fmt in formats.items():
+        if frame[column].dtype.kind != 'M':
+            stamps = _parse_fixed_width(frame[column], fmt)
+            if stamps is None:
+                stamps = pd.to_datetime(frame[column], format=fmt)
+            frame[column] = stamps
+    return frame
+
+
+def add_calendar_columns(frame, column):
+    """Derive DATE, YEAR, MONTH ('YYYY-MM'), DAY and HOUR from a timestamp column."""
+    stamps = frame[column].dt
+    frame['DATE'] = stamps.normalize()
+    frame['YEAR'] = stamps.year
+    # format each distinct month once instead of every row
+    months, uniques = pd.factorize(stamps.year * 12 + stamps.month - 1)
+    labels = np.array(['{:04d}-{:02d}'.format(m // 12, m % 12 + 1) for m in uniques] + [np.nan], dtype=object)
+    frame['MONTH'] = labels[months]
+    frame['DAY'] = stamps.day
+    frame['HOUR'] = stamps.hour
+    return frame
+
+
+def _parse_frame(path):
+    frame = pd.DataFrame(_read_json(path)).reset_index(drop=True)
+    return normalize_timestamps(frame, TIMESTAMP_COLUMNS.get(path, {}))
+
+
+def _bundle_dir(path, stamp):
+    return os.path.join(os.path.splitext(path)[0] + BUNDLE_SUFFIX,
+                        '{:x}-{:x}-v{}'.format(stamp[0], stamp[1], BUNDLE_FORMAT))
+
+
+def write_bundle(frame, path, stamp):
+    """Store ``frame`` as one ``.npy`` file per column for the source version ``stamp``.
+
+    Text columns become fixed width unicode arrays with a separate null mask,
+    everything else keeps its NumPy dtype, so the bundle loads without parsing.
+    """
+    target = _bundle_dir(path, stamp)
+    if os.path.isdir(target):
+        return target
+    tmp = '{}.tmp{}'.format(target, os.getpid())
+    os.makedirs(tmp, exist_ok=True)
+    columns = []
+    for number, name in enumerate(frame.columns):
+        values = frame[name]
+        entry = {'name': name, 'file': '{:03d}.npy'.format(number)}
+        if values.dtype.kind not in 'biufmM':
+            nulls = values.isna().to_numpy()
+            values = values.where(~nulls, '')
+            if nulls.any():
+                entry['nulls'] = '{:03d}.nulls.npy'.format(number)
+                np.save(os.path.join(tmp, entry['nulls']), nulls)
+            np.save(os.path.join(tmp, entry['file']), values.to_numpy(dtype=str))
+        else:
+            np.save(os.path.join(tmp, entry['file']), values.to_numpy())
+        columns.append(entry)
+    with open(os.path.join(tmp, 'columns.json'), 'w') as json_file:
+        json.dump(columns, json_file)
+    try:
+        os.rename(tmp, target)
+    except OSError:
+        # a concurrent writer finished first
+        shutil.rmtree(tmp, ignore_errors=True)
+    parent = os.path.dirname(target)
+    for old in os.listdir(parent):
+        if os.path.join(parent, old) != target:
+            shutil.rmtree(os.path.join(parent, old), ignore_errors=True)
+    return target
+
+
+def read_bundle(path, stamp):
+    """Load the compacted table of source version ``stamp``, memory-mapping numeric columns."""
+    target = _bundle_dir(path, stamp)
+    with open(os.path.join(target, 'columns.json')) as json_file:
+        columns = json.load(json_file)
+    data = {}
+    for entry in columns:
+        # plain ndarray view over the mapped file, no copy
+        values = np.asarray(np.load(os.path.join(target, entry['file']), mmap_mode='r'))
+        if values.dtype.kind == 'U':
+            values = values.astype(object)
+            if 'nulls' in entry:
+                values[np.load(os.path.join(target, entry['nulls']))] = None
+        data[entry['name']] = values
+    return pd.DataFrame(data, copy=False)
+
+
+def _read_frame(path):
+    stamp = _source_stamp(path)
+    try:
+        return read_bundle(path, stamp)
+    except (OSError, ValueError):
+        pass
+    frame = _parse_frame(path)
+    try:
+        write_bundle(frame, path, stamp)
+    except OSError:
+        # read-only deployments keep working from the JSON export
+        pass
+    return frame
+
+
+def _source_frame(path):
+    return _cached('source', path, _read_frame)
+
+
+def _coil_tracking_rows(query_result):
+    query_result["Start"] = query_result["DTSTARTROLL"]
+    query_result['Date'] = query_result.Start.dt.normalize()
+    query_result["Finish"] = query_result["DTDEPARTURE"]
     query_result["Task"] = query_result["COILIDOUT"]
     query_result["Resource"] = query_result["ENTRYWIDTH"]
     query_result.dropna(axis=0, how='any', subset=["Start", "Finish"],
@@ -17,47 +327,657 @@ def get_coil_tracking():
     return query_result
 
 
-def get_production():
-    with open('data/Prod_tab.json') as json_file:
-        data = json.load(json_file)
-    query_result = pd.DataFrame(data)
+def _production_rows(query_result, mean_weight=None):
     # Fill Weight value to mean value or previous value
     query_result = query_result.replace('', np.nan)
-    mean_weight = query_result['EXITWEIGHTMEAS'].mean(skipna=True)
+    if mean_weight is None:
+        mean_weight = query_result['EXITWEIGHTMEAS'].mean(skipna=True)
     query_result.loc[query_result.EXITWEIGHTMEAS == 0, 'EXITWEIGHTMEAS'] = mean_weight
-    query_result['EXITWEIGHTMEAS'] = query_result['EXITWEIGHTMEAS'].apply(lambda x: np.round(x, decimals=2))
-    # query_result.fillna(method='ffill', inplace=True)
-    # query_result['Date'] = query_result['DTDEPARTURE'].dt.date
-    # query_result.dropna(axis=0, how='all')
-    print(query_result.head())
+    query_result['EXITWEIGHTMEAS'] = query_result['EXITWEIGHTMEAS'].round(2)
     return query_result
 
 
-def get_stop_time():
-    with open('data/stop_tab.json') as json_file:
-        data = json.load(json_file)
-    query_result = pd.DataFrame(data)
-    # query_result.set_index(['DTSTORE'], inplace=True)
+def _stop_time_rows(query_result):
     # query_result['PLANT'] = query_result.PLANT.map({1: 'PL', 2: 'TCM', 3: 'PLTCM'})
-    query_result['DURATION'] = np.abs(pd.to_datetime(query_result['DTEND']) - pd.to_datetime(query_result['DTSTART']))
-    query_result['DURATION'] = query_result['DURATION'] / np.timedelta64(1, 'm')
-    query_result['DTSTORE'] = pd.to_datetime(query_result['DTSTORE'])
-    query_result['DATE'] = pd.to_datetime(query_result.DTSTORE.dt.date)
-    query_result['YEAR'] = query_result.DTSTORE.dt.year
-    query_result['MONTH'] = query_result.DTSTORE.dt.date.map(lambda x: x.strftime('%Y-%m'))
-    query_result['DAY'] = query_result.DTSTORE.dt.day
-    query_result['HOUR'] = query_result.DTSTORE.dt.hour
+    query_result['DURATION'] = np.abs(query_result['DTEND'] - query_result['DTSTART']) / np.timedelta64(1, 'm')
+    return add_calendar_columns(query_result, 'DTSTORE')
+
+
+def _build_coil_tracking(path):
+    return _coil_tracking_rows(_source_frame(path).copy(deep=False))
+
+
+def _build_production(path):
+    query_result = _production_rows(_source_frame(path).copy(deep=False))
+    query_result = query_result.sort_values('DTENDROLLING', kind='mergesort', ignore_index=True)
+    print(query_result.head())
+    return query_result
+
+
+def _build_stop_time(path):
+    query_result = _stop_time_rows(_source_frame(path).copy(deep=False))
+    # sorted by DTSTORE, which keeps DATE sorted too
+    query_result = query_result.sort_values('DTSTORE', kind='mergesort', ignore_index=True)
     print(query_result.tail())
     return query_result
 
 
-def get_segment_data():
-    with open('data/segmentdata.json') as json_file:
-        data = json.load(json_file)
-    return data
+def _build_production_rollup(path):
+    return DailyRollup.from_coils(_cached('production', path, _build_production))
+
+
+# Incremental ingest. Rows newer than the high-water mark of a source are
+# appended to the frames and rollups built from its last full export, so a
+# refresh costs the new rows only. New rows arrive through ingest() or, when
+# DATAMANAGER_PRODUCTION_FEED / DATAMANAGER_STOP_TIME_FEED name a CSV file
+# with the export's columns, from the lines appended to that file.
+HIGH_WATER_COLUMNS = {PRODUCTION_SOURCE: 'DTENDROLLING', STOP_TIME_SOURCE: 'DTSTORE'}
+_DERIVED = {
+    PRODUCTION_SOURCE: {'production': _build_production, 'coil_tracking': _build_coil_tracking},
+    STOP_TIME_SOURCE: {'stop_time': _build_stop_time},
+}
+_FEEDS = {path: CsvFeed(os.environ[variable]) for path, variable in
+          ((PRODUCTION_SOURCE, 'DATAMANAGER_PRODUCTION_FEED'), (STOP_TIME_SOURCE, 'DATAMANAGER_STOP_TIME_FEED'))
+          if os.environ.get(variable)}
+_ingest_log = {PRODUCTION_SOURCE: [], STOP_TIME_SOURCE: []}
+# feed lines that could not be parsed, per source
+_rejected = {PRODUCTION_SOURCE: 0, STOP_TIME_SOURCE: 0}
+_increments = {}
+
+
+class _Snapshot(object):
+    """Frames and rollup of one data version, published as a whole.
+
+    Never modified once published: a refresh builds the next snapshot and
+    swaps it in with a single assignment, so readers take no lock and always
+    see frames, rollup and ingested rows of the same version.
+
+    ``rows`` and ``digest`` identify the rows ingested on top of the export:
+    their count and the sum of their row hashes, which is the same for every
+    process that took in the same rows, whatever the batching.
+    """
+
+    def __init__(self, frames, rollup, rows, digest):
+        self.frames = frames
+        self.rollup = rollup
+        self.rows = rows
+        self.digest = digest
+
+
+class _Increment(object):
+    """Frames of one full export version plus the rows ingested since.
+
+    Only the thread holding _load_lock appends; readers go through
+    ``snapshot``.
+    """
+
+    def __init__(self, path, stamp):
+        self.path = path
+        self.stamp = stamp
+        self.tables = {name: AppendOnlyTable(_cached(name, path, build)) for name, build in _DERIVED[path].items()}
+        self.high_water = _cached('source', path, _read_frame)[HIGH_WATER_COLUMNS[path]].max()
+        rollup = None
+        if path == PRODUCTION_SOURCE:
+            self.mean_weight = self.tables['production'].frame()['EXITWEIGHTMEAS'].mean()
+            rollup = _cached('production_rollup', path, _build_production_rollup)
+        self.snapshot = self._publish(rollup, 0, 0)
+
+    def _publish(self, rollup, rows, digest):
+        return _Snapshot({name: table.frame() for name, table in self.tables.items()}, rollup, rows, digest)
+
+    def apply(self, rows):
+        """Append the rows past the high-water mark and return them."""
+        column = HIGH_WATER_COLUMNS[self.path]
+        # sorted, so the tables stay ordered by their high-water column
+        rows = rows.loc[rows[column] > self.high_water].sort_values(column, kind='mergesort', ignore_index=True)
+        if rows.empty:
+            return rows
+        # appended rows lie past the length of the published frames, which
+        # therefore stay valid for the readers still holding them
+        rollup = self.snapshot.rollup
+        if self.path == PRODUCTION_SOURCE:
+            coils = _production_rows(rows.copy(), self.mean_weight)
+            self.tables['production'].append(coils)
+            self.tables['coil_tracking'].append(_coil_tracking_rows(rows.copy()))
+            rollup = rollup.merge(coils)
+        else:
+            self.tables['stop_time'].append(_stop_time_rows(rows.copy()))
+        self.high_water = rows[column].max()
+        # uint64 sums wrap around, which keeps the digest at 64 bits
+        digest = (self.snapshot.digest + int(pd.util.hash_pandas_object(rows, index=False).sum())) % 2 ** 64
+        self.snapshot = self._publish(rollup, self.snapshot.rows + len(rows), digest)
+        return rows
+
+
+def _increment(path):
+    """The increment on top of the current export of ``path``, or None if nothing was ingested."""
+    feed = _FEEDS.get(path)
+    # while another thread takes in new rows, readers go on with the
+    # snapshot published before
+    if feed is not None and _load_lock.acquire(blocking=False):
+        try:
+            _poll(path, feed)
+        except Exception as error:
+            # a broken feed must not fail the page that happened to poll it;
+            # the rows are read again on the next poll
+            print('ingest feed {}: {}'.format(feed.path, error))
+        finally:
+            _load_lock.release()
+    increment = _increments.get(path)
+    if increment is not None and increment.stamp == _source_stamp(path):
+        return increment
+    if not _ingest_log.get(path):
+        return None
+    # a new full export to replay the log onto: one thread rebuilds, the
+    # others go on with the increment of the export before, if there is one
+    if _load_lock.acquire(blocking=increment is None):
+        try:
+            current = _increments.get(path)
+            if current is not None and current.stamp == _source_stamp(path):
+                return current
+            return _rebuild(path)
+        finally:
+            _load_lock.release()
+    return increment
+
+
+def _poll(path, feed):
+    source = _cached('source', path, _read_frame)
+    text_columns = [c for c, dtype in source.dtypes.items() if dtype.kind not in 'biufmM']
+    rows = feed.read_new(dtype=dict.fromkeys(text_columns + list(TIMESTAMP_COLUMNS[path]), str))
+    if rows is None:
+        return
+    try:
+        rows = _prepare(path, rows)
+    except Exception:
+        # malformed lines are set aside one by one, the others taken in
+        good = []
+        for position in range(len(rows)):
+            row = rows.iloc[position:position + 1]
+            try:
+                good.append(_prepare(path, row))
+            except Exception as error:
+                _rejected[path] += 1
+                print('ingest feed {}: rejected {}: {}'.format(feed.path, row.to_dict('records')[0], error))
+        rows = pd.concat(good, ignore_index=True) if good else None
+    if rows is not None:
+        _ingest(path, rows)
+    feed.commit()
+
+
+def _rebuild(path):
+    # a new full export: replay what it does not contain yet; the caller
+    # holds _load_lock
+    increment = _Increment(path, _source_stamp(path))
+    log = [increment.apply(rows) for rows in _ingest_log[path]]
+    _ingest_log[path] = [rows for rows in log if not rows.empty]
+    _increments[path] = increment
+    return increment
+
+
+def _ingest(path, rows):
+    # rows as returned by _prepare
+    increment = _increments.get(path)
+    if increment is None or increment.stamp != _source_stamp(path):
+        increment = _rebuild(path)
+    versions = {dataset: data_version(dataset) for dataset, source in _DATASET_SOURCES.items() if source == path}
+    rows = increment.apply(rows)
+    if rows.empty:
+        return 0
+    _ingest_log[path].append(rows)
+    times = rows[HIGH_WATER_COLUMNS[path]]
+    _invalidate_frames(versions, times.min().normalize(), times.max())
+    return len(rows)
+
+
+def _prepare(path, rows):
+    """Export rows in the columns and types of the source of ``path``."""
+    source = _cached('source', path, _read_frame)
+    rows = rows[list(source.columns)].astype({c: dtype for c, dtype in source.dtypes.items() if dtype.kind in 'biuf'})
+    return normalize_timestamps(rows, TIMESTAMP_COLUMNS[path])
+
+
+def ingest(dataset, rows):
+    """Append export rows of ``dataset`` newer than its high-water mark.
+
+    ``rows`` has the columns of the table export, with timestamps as text or
+    already parsed. Returns the number of rows taken.
+    """
+    with _load_lock:
+        path = _DATASET_SOURCES[dataset]
+        return _ingest(path, _prepare(path, rows))
+
+
+def _current(name, path, build):
+    increment = _increment(path)
+    if increment is not None:
+        return increment.snapshot.frames[name]
+    return _cached(name, path, build)
+
+
+def time_slice(frame, column, start_date=None, end_date=None):
+    """Rows of ``frame`` with ``start_date < column <= end_date``, as a slice of it.
+
+    ``frame`` must be sorted by ``column``. The datetime64 values are the
+    int64 epoch index, so the bounds are found by two binary searches
+    instead of comparing every row.
+    """
+    times = frame[column].to_numpy()
+    lo = 0 if start_date is None else np.searchsorted(times, _bound(start_date, times.dtype), side='right')
+    hi = len(times) if end_date is None else np.searchsorted(times, _bound(end_date, times.dtype), side='right')
+    return frame.iloc[lo:max(lo, hi)]
+
+
+def _bound(value, dtype):
+    # in the column's own unit, so searchsorted does not cast the column
+    return pd.Timestamp(value).to_datetime64().astype(dtype)
+
+
+def get_coil_tracking():
+    """The coil tracking frame of the current snapshot, safe to modify under copy-on-write."""
+    return _current('coil_tracking', PRODUCTION_SOURCE, _build_coil_tracking).copy(deep=False)
+
+
+_indexes = {}
+
+
+def get_coil_tracking_index():
+    """TimeIndex of the coil tracking frame on Start, built once per data version.
+
+    A new export produces a new frame, which the index is rebuilt for;
+    coils ingested on top of the same export are merged into the index of
+    the frame before. The frame is shared by every callback and session and
+    must not be modified in place; ``window()`` returns copies.
+    """
+    increment = _increment(PRODUCTION_SOURCE)
+    if increment is None:
+        frame = _cached('coil_tracking', PRODUCTION_SOURCE, _build_coil_tracking)
+    else:
+        frame = increment.snapshot.frames['coil_tracking']
+    owner, index = _indexes.get('coil_tracking', (None, None))
+    if index is None or index.frame is not frame:
+        # the tables of an increment only grow, so its earlier frames are
+        # prefixes of the later ones
+        if increment is not None and owner is increment and len(index.frame) <= len(frame):
+            index = index.extended(frame)
+        else:
+            index = TimeIndex(frame, 'Start')
+        _indexes['coil_tracking'] = (increment, index)
+    return index
+
+
+def get_production(start_date=None, end_date=None):
+    """Coils finishing rolling in ``(start_date, end_date]``, ordered by DTENDROLLING."""
+    frame = _current('production', PRODUCTION_SOURCE, _build_production)
+    return time_slice(frame, 'DTENDROLLING', start_date, end_date)
+
+
+def get_stop_time(start_date=None, end_date=None):
+    """Delays stored on a DATE in ``(start_date, end_date]``, ordered by DTSTORE."""
+    frame = _current('stop_time', STOP_TIME_SOURCE, _build_stop_time)
+    return time_slice(frame, 'DATE', start_date, end_date)
+
+
+def get_production_rollup():
+    """Daily partial aggregates of get_production(), kept current with ingested coils."""
+    increment = _increment(PRODUCTION_SOURCE)
+    if increment is not None:
+        return increment.snapshot.rollup
+    return _cached('production_rollup', PRODUCTION_SOURCE, _build_production_rollup)
+
+
+def _read_points(path):
+    """Decode a measuring point bundle into ``{point: frame}``.
+
+    The exports hold the JSON text of a JSON text of ``{'df_00': ..., 'df_10': ...}``
+    with every frame in pandas' split orientation. The time column is parsed
+    here and the frames sorted by it, so callbacks get ordered datetime64
+    values.
+    """
+    bundle = _read_json(path)
+    while isinstance(bundle, str):
+        bundle = json.loads(bundle)
+    points = {}
+    for name, frame in bundle.items():
+        frame = pd.read_json(io.StringIO(frame), orient='split')
+        if 'time' in frame:
+            # written either as epoch milliseconds or as '%Y-%m-%d %H:%M:%S.%f' text
+            if pd.api.types.is_numeric_dtype(frame['time']):
+                frame['time'] = pd.to_datetime(frame['time'], unit='ms')
+            else:
+                frame['time'] = pd.to_datetime(frame['time'], format='ISO8601')
+            # the pages look up visible ranges with searchsorted
+            frame = frame.sort_values('time', kind='mergesort', ignore_index=True)
+        points[int(name[3:])] = frame
+    return points
+
+
+# frames of the latest ring version read, as (version, {point: frame})
+_ring_frames = (None, None)
+
+
+def _ring_points():
+    """``{point: frame}`` of the measuring point rings, or None while no writer has created them."""
+    version = measuring_point_store().version()
+    if version is None:
+        return None
+    held = _ring_frames
+    if held[0] != version:
+        held = _flight.do(('rings', version), _read_rings, version)
+    return held[1]
+
+
+def _element_columns(columns):
+    # fields with several values per telegram become one column per value,
+    # Field_0, Field_1, ...
+    for field, values in columns.items():
+        if values.ndim == 1:
+            yield field, values
+        else:
+            values = values.reshape(len(values), -1)
+            for element in range(values.shape[1]):
+                yield '{}_{}'.format(field, element), values[:, element]
+
+
+def _read_rings(version):
+    global _ring_frames
+    points = {}
+    for point, columns in measuring_point_store().points().items():
+        frame = pd.DataFrame(dict(_element_columns(columns)))
+        if not frame['time'].is_monotonic_increasing:
+            frame = frame.sort_values('time', kind='mergesort', ignore_index=True)
+        points[point] = frame
+    _ring_frames = (version, points)
+    return _ring_frames
+
+
+def get_segment_points():
+    """Segment frames of the measuring points.
+
+    Read from the rings while a telegram writer fills them, otherwise
+    decoded once per JSON export.
+    """
+    points = _ring_points()
+    if points is not None:
+        return points
+    return _cached('segment_points', SEGMENT_SOURCE, _read_points)
+
+
+def get_process_points():
+    """Process frames of the measuring points, from the rings like ``get_segment_points``.
+
+    The frames are shared by every callback and session and must not be
+    modified in place.
+    """
+    points = _ring_points()
+    if points is not None:
+        return points
+    return _cached('process_points', PROCESS_SOURCE, _read_points)
+
+
+_DATASET_SOURCES = {
+    'production': PRODUCTION_SOURCE,
+    'coil_tracking': PRODUCTION_SOURCE,
+    'stop_time': STOP_TIME_SOURCE,
+    'segment': SEGMENT_SOURCE,
+    'process': PROCESS_SOURCE,
+}
+# datasets read from the measuring point rings when there are any
+_RING_DATASETS = ('segment', 'process')
+
+
+def data_version(dataset):
+    """Opaque token that changes whenever the source of ``dataset`` changes or rows are ingested.
+
+    The token is derived from the export and the ingested rows, or from the
+    measuring point rings, only, so processes holding the same data agree on
+    it, which the shared cache tier relies on.
+    """
+    if dataset in _RING_DATASETS:
+        version = measuring_point_store().version()
+        if version is not None:
+            return 'rings-' + version
+    path = _DATASET_SOURCES[dataset]
+    stamp = _source_stamp(path)
+    increment = _increments.get(path)
+    rows = digest = 0
+    # until the log is replayed onto a new export, readers are served the
+    # increment of the export before
+    if increment is not None and (increment.stamp == stamp or _ingest_log.get(path)):
+        stamp = increment.stamp
+        rows, digest = increment.snapshot.rows, increment.snapshot.digest
+    return '{:x}-{:x}-{:x}-{:x}'.format(stamp[0], stamp[1], rows, digest)
+
+
+def current_versions():
+    """``data_version`` of every dataset with an existing source, after polling the ingest feeds."""
+    for path in _FEEDS:
+        _increment(path)
+    versions = {}
+    for dataset in _DATASET_SOURCES:
+        try:
+            versions[dataset] = data_version(dataset)
+        except OSError:
+            pass
+    return versions
+
+
+def register_query(dataset):
+    """Decorator registering ``query(start_date, end_date)`` as the producer of ``dataset`` frames."""
+    def register(query):
+        _queries[dataset] = query
+        return query
+    return register
+
+
+def _frame_key(dataset, start_date, end_date, version):
+    return json.dumps({'dataset': dataset, 'start_date': start_date, 'end_date': end_date,
+                       'version': version}, sort_keys=True)
+
+
+def _invalidate_frames(versions, first, last):
+    """Carry stored frames over to the new data version unless new rows fall in their range.
+
+    ``versions`` maps the affected datasets to their version before the rows
+    timed from ``first`` to ``last`` were ingested.
+    """
+    for key in _frame_store.keys():
+        params = frame_params(key)
+        if versions.get(params['dataset']) != params['version']:
+            continue
+        frame = _frame_store.pop(key)
+        start, end = params['start_date'], params['end_date']
+        if frame is None or start is None or end is None:
+            continue
+        if pd.Timestamp(start) < last and pd.Timestamp(end) >= first:
+            continue
+        version = data_version(params['dataset'])
+        _frame_store.put(_frame_key(params['dataset'], start, end, version), frame)
+
+
+def query_frame(dataset, start_date=None, end_date=None):
+    """Run the query of ``dataset`` for a date range and return the frame key.
+
+    The key is a small JSON document naming the dataset, the date range and
+    the data version, so any worker can rebuild the frame if it is not in its
+    own store.
+    """
+    _increment(_DATASET_SOURCES[dataset])
+    key = _frame_key(dataset, start_date, end_date, data_version(dataset))
+    if key not in _frame_store:
+        _flight.do(key, _run_query, key, dataset, start_date, end_date)
+    return key
+
+
+def _run_query(key, dataset, start_date, end_date):
+    return _frame_store.put(key, _queries[dataset](start_date, end_date))
+
+
+# refreshes checked against the frame a client already holds, per dataset
+_version_checks = {}
+_version_lock = threading.Lock()
+
+
+def is_current(key):
+    """Whether the frame ``key`` held by a client is still of the current data version.
+
+    Lets a refresh return before anything is read, filtered or serialized.
+    The checks and the unchanged answers are counted in ``cache_stats()``.
+    """
+    if not key:
+        return False
+    dataset = frame_params(key)['dataset']
+    current = _key_current(key)
+    with _version_lock:
+        counts = _version_checks.setdefault(dataset, {'checked': 0, 'unchanged': 0})
+        counts['checked'] += 1
+        counts['unchanged'] += current
+    return current
+
+
+def _key_current(key):
+    params = frame_params(key)
+    dataset = params['dataset']
+    _increment(_DATASET_SOURCES[dataset])
+    return params['version'] == data_version(dataset)
+
+
+def frame_params(key):
+    """Dataset, date range and data version encoded in a frame key."""
+    return json.loads(key)
+
+
+def get_frame(key):
+    """Return the frame stored under ``key``, rebuilding it when evicted.
+
+    An evicted frame of an older data version cannot be rebuilt; the frame
+    of the same range at the current version is returned instead, stored
+    under its own key. Frames are shared between callbacks and sessions and
+    must not be modified in place.
+    """
+    frame = _frame_store.get(key)
+    if frame is None:
+        params = frame_params(key)
+        dataset, start_date, end_date = params['dataset'], params['start_date'], params['end_date']
+        _increment(_DATASET_SOURCES[dataset])
+        if params['version'] != data_version(dataset):
+            return get_frame(query_frame(dataset, start_date, end_date))
+        frame = _flight.do(key, _run_query, key, dataset, start_date, end_date)
+    return frame
+
+
+_stores = {}
+
+
+def measuring_point_store(writable=False):
+    """The measuring point rings of this process, read-only unless ``writable``."""
+    store = _stores.get(writable)
+    if store is None:
+        store = _stores.setdefault(writable, MeasuringPointStore(RING_DIR, RING_CAPACITY, RING_WINDOW, writable))
+    return store
+
+
+def memoize_figure(*arguments):
+    """Decorator caching a callback's output on the named ``arguments``.
+
+    Use it under ``@app.callback`` with the arguments the output depends on,
+    e.g. ``@memoize_figure('key')`` for callbacks drawing a stored frame.
+    Calls with a frame key of an older data version are not cached:
+    ``get_frame`` answers them with current data, which must not be stored
+    under the old key.
+    """
+    return memoize(_figure_cache, *arguments, flight=_flight, cacheable=_keys_current)
+
+
+def _keys_current(arguments):
+    return all(_key_current(value) for value in arguments.values()
+               if isinstance(value, str) and value.startswith('{"dataset": '))
+
+
+def coalesce(key, function, *args, **kwargs):
+    """``function(*args, **kwargs)``, computed once for concurrent calls with the same ``key``.
+
+    For work that is not cached, e.g. the streamed measuring point figures.
+    ``key`` must tell the data versions apart, by their version or by the
+    identity of the data the call reads.
+    """
+    return _flight.do(key, function, *args, **kwargs)
+
+
+def cache_stats():
+    """Hit/miss/reload counters of the shared data cache, the frame store and
+    the figure cache, the refreshes short-circuited by ``is_current``, the
+    calls coalesced with concurrent identical ones and the feed rows
+    rejected as malformed."""
+    stats = _cache.stats()
+    stats['reloads'] = _reloads
+    stats['frame_store'] = _frame_store.stats()
+    stats['figures'] = _figure_cache.stats()
+    stats['single_flight'] = _flight.stats()
+    stats['rejected_rows'] = {os.path.basename(path): count for path, count in _rejected.items()}
+    with _version_lock:
+        stats['version_checks'] = {dataset: dict(counts) for dataset, counts in _version_checks.items()}
+    return stats
+
+
+# Loaders run by warm_up(), with the names reported on /ready.
+_WARM_UP = [
+    ('production', get_production),
+    ('coil_tracking', get_coil_tracking),
+    ('production_rollup', get_production_rollup),
+    ('stop_time', get_stop_time),
+    ('segment', get_segment_points),
+    ('process', get_process_points),
+]
+_readiness = {'ready': False, 'seconds': None, 'datasets': {}}
+
+
+def warm_up():
+    """Load and normalize every dataset into the caches of this process.
+
+    gunicorn runs it in the master before forking the workers (see
+    gunicorn.conf.py), so they start with the parsed data and share its pages
+    copy-on-write. A dataset that fails to load is reported and left to the
+    first callback needing it.
+    """
+    started = time.perf_counter()
+    datasets = {}
+    for name, load in _WARM_UP:
+        begun = time.perf_counter()
+        try:
+            load()
+        except Exception as error:
+            datasets[name] = {'error': str(error)}
+        else:
+            datasets[name] = {'ms': round((time.perf_counter() - begun) * 1000, 1)}
+    _readiness.update(ready=True, seconds=round(time.perf_counter() - started, 3), datasets=datasets)
+    return readiness()
+
+
+def readiness():
+    """Whether warm_up() has completed, with the load time or error of every dataset."""
+    return dict(_readiness, datasets=dict(_readiness['datasets']))
+
+
+def compact_sources():
+    """Convert the table exports into column bundles and report load times."""
+    for path in TIMESTAMP_COLUMNS:
+        stamp = _source_stamp(path)
+        started = time.perf_counter()
+        frame = _parse_frame(path)
+        parsed = time.perf_counter()
+        target = write_bundle(frame, path, stamp)
+        loaded = time.perf_counter()
+        read_bundle(path, stamp)
+        done = time.perf_counter()
+        print('{}: {} rows, json {:.1f} ms, bundle {:.1f} ms -> {}'.format(
+            os.path.basename(path), len(frame), (parsed - started) * 1000, (done - loaded) * 1000, target))
 
 
-def get_process_data():
-    with open('data/processdata.json') as json_file:
-        data = json.load(json_file)
-    return data
+if __name__ == '__main__':
+    if sys.argv[1:] == ['compact']:
+        compact_sources()
+    elif sys.argv[1:] == ['warm-up']:
+        print(json.dumps(warm_up(), indent=2))
+    else:
+        print('usage: python datamanager.py compact|warm-up')
@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+
+# points sent per trace for the visible x range, about one per pixel of a
+# full width graph; the parts outside the range are kept at OVERVIEW_POINTS
+# so the rangeslider still shows the whole series
+VIEW_POINTS = 1000
+OVERVIEW_POINTS = 200
+
+
+def _numeric(values):
+    values = np.asarray(values)
+    if values.dtype.kind == 'M':
+        return values.astype('datetime64[ns]').astype(np.int64).astype(np.float64)
+    return values.astype(np.float64)
+
+
+def _bucket_edges(start, stop, buckets):
+    return np.linspace(start, stop, buckets + 1).astype(np.int64)
+
+
+def _evenly(n, points):
+    return np.unique(np.linspace(0, n - 1, points).astype(np.int64)) if points > 0 else np.arange(0)
+
+
+def lttb(x, y, points):
+    """Indices of ``points`` samples picked by largest-triangle-three-buckets.
+
+    The first and last samples are always kept. Every bucket in between
+    contributes the sample forming the largest triangle with the sample kept
+    for the previous bucket and the mean of the next bucket, which keeps the
+    visual shape of the line including its peaks.
+    """
+    n = len(y)
+    if points >= n:
+        return np.arange(n)
+    if points < 3:
+        return _evenly(n, points)
+    x, y = _numeric(x), _numeric(y)
+    edges = _bucket_edges(1, n - 1, points - 2)
+    # mean of every bucket, with the last sample as the bucket after the last
+    sums_x, sums_y = np.add.reduceat(x[1:n - 1], edges[:-1] - 1), np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    sizes = np.diff(edges)
+    mean_x = np.append(sums_x / sizes, x[-1])
+    mean_y = np.append(sums_y / sizes, y[-1])
+    selected = np.empty(points, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    ax, ay = x[0], y[0]
+    for bucket in range(points - 2):
+        lo, hi = edges[bucket], edges[bucket + 1]
+        cx, cy = mean_x[bucket + 1], mean_y[bucket + 1]
+        # twice the triangle area, up to a term constant within the bucket
+        area = np.abs((x[lo:hi] - ax) * (cy - ay) - (y[lo:hi] - ay) * (cx - ax))
+        pick = lo + int(area.argmax())
+        selected[bucket + 1] = pick
+        ax, ay = x[pick], y[pick]
+    return selected
+
+
+def minmax(x, y, points):
+    """Indices of the minimum and maximum of ``points // 2`` equal buckets.
+
+    Keeps the full envelope of noisy signals, at the cost of drawing the
+    line between the extremes of every bucket.
+    """
+    n = len(y)
+    buckets = points // 2
+    if points >= n:
+        return np.arange(n)
+    if buckets < 1:
+        return _evenly(n, points)
+    edges = _bucket_edges(0, n, buckets)
+    # sorted by bucket and then value, every bucket starts with its minimum
+    # and ends with its maximum
+    order = np.lexsort((_numeric(y), np.repeat(np.arange(buckets), np.diff(edges))))
+    return np.unique(np.concatenate([order[edges[:-1]], order[edges[1:] - 1]]))
+
+
+METHODS = {'lttb': lttb, 'minmax': minmax}
+
+
+def view_indices(x, y, x_range=None, points=VIEW_POINTS, overview=OVERVIEW_POINTS, method='lttb'):
+    """Indices of the samples of ``x``/``y`` to draw for the visible ``x_range``.
+
+    ``x`` must be sorted. Samples inside ``x_range`` (plus one on either side
+    so the line reaches the edges) are reduced to ``points``; the samples
+    before and after it share ``overview`` points. Without a range the whole
+    series is reduced to ``points``. NaN values of ``y`` are skipped.
+    """
+    reduce = METHODS[method]
+    valid = np.flatnonzero(~pd.isna(np.asarray(y)))
+    x, y = np.asarray(x)[valid], np.asarray(y)[valid]
+    if x_range is None:
+        return valid[reduce(x, y, points)]
+    lo, hi = np.searchsorted(x, np.asarray(x_range, dtype=x.dtype))
+    lo, hi = max(lo - 1, 0), min(hi + 1, len(x))
+    before, after = lo, len(x) - hi
+    share = overview * before // max(before + after, 1)
+    parts = [reduce(x[:lo], y[:lo], share),
+             lo + reduce(x[lo:hi], y[lo:hi], points),
+             hi + reduce(x[hi:], y[hi:], overview - share)]
+    return valid[np.concatenate(parts)]
+
+
+def relayout_range(relayout_data):
+    """x range of a ``relayoutData`` event as datetime64 values.
+
+    None when the axis is autoranged or the event did not set a range.
+    """
+    if not relayout_data or relayout_data.get('xaxis.autorange'):
+        return None
+    if 'xaxis.range[0]' in relayout_data:
+        bounds = relayout_data['xaxis.range[0]'], relayout_data['xaxis.range[1]']
+    elif 'xaxis.range' in relayout_data:
+        bounds = relayout_data['xaxis.range']
+    else:
+        return None
+    return tuple(pd.Timestamp(bound).to_datetime64() for bound in bounds)
@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objs as go
+
+# bars are colored by entry width on a fixed scale, so a width has the same
+# color on every day; widths outside the range take the end colors
+COLORSCALE = 'Viridis'
+WIDTH_RANGE = (900, 1550)
+
+
+def gantt_bar(coils, width_range=WIDTH_RANGE):
+    """One horizontal Bar drawing every coil from Start to Finish.
+
+    ``coils`` has the Start/Finish/Task/Resource columns of the coil tracking
+    frame. Each bar starts at its ``base`` and is as long as the coil took,
+    in milliseconds as the date axis counts them, and colored by Resource,
+    the entry width, between the bounds of ``width_range``.
+    """
+    start = coils['Start'].to_numpy(dtype='datetime64[ms]')
+    finish = coils['Finish'].to_numpy(dtype='datetime64[ms]')
+    widths = coils['Resource'].to_numpy(dtype=np.float64)
+    return go.Bar(
+        y=coils['Task'].to_numpy(dtype=object),
+        x=(finish - start).astype(np.int64),
+        base=np.datetime_as_string(start, unit='s'),
+        customdata=np.column_stack([np.datetime_as_string(start, unit='s'), np.datetime_as_string(finish, unit='s')]),
+        orientation='h',
+        marker=dict(color=widths, colorscale=COLORSCALE, cmin=width_range[0], cmax=width_range[1],
+                    colorbar=dict(title='Width')),
+        hovertemplate='%{y}<br>%{customdata[0]} - %{customdata[1]}<br>width %{marker.color}<extra></extra>',
+    )
+
+
+def gantt_figure(coils, title, width_range=WIDTH_RANGE):
+    """Gantt chart of ``coils``, one row per coil in the order given."""
+    layout = dict(title=title,
+                  xaxis={'type': 'date', 'showgrid': True},
+                  yaxis={'type': 'category', 'autorange': 'reversed', 'showgrid': True},
+                  bargap=0.5,
+                  hovermode='closest')
+    return dict(data=[gantt_bar(coils, width_range)], layout=layout)
+
+
+# The coil timeline draws single coils up to DETAIL_COILS and otherwise
+# collapses them into the first of BLOCKS giving at most MAX_BLOCKS bars.
+DETAIL_COILS = 500
+MAX_BLOCKS = 240
+BLOCKS = [('hour', np.timedelta64(1, 'h')), ('shift', np.timedelta64(8, 'h')), ('day', np.timedelta64(1, 'D'))]
+
+
+def block_totals(times, weights, block):
+    """Start, coil count and tons of the ``block`` long periods holding ``times``.
+
+    ``times`` must be sorted. Periods are aligned to midnight, so shifts run
+    00-08, 08-16 and 16-24; periods without coils are left out.
+    """
+    step = block.astype('timedelta64[ms]').astype(np.int64)
+    bins = times.astype('datetime64[ms]').astype(np.int64) // step
+    first = bins[0]
+    counts = np.bincount(bins - first)
+    tons = np.bincount(bins - first, weights=np.nan_to_num(weights.astype(np.float64))) / 1000
+    used = np.flatnonzero(counts)
+    return ((used + first) * step).astype('datetime64[ms]'), counts[used], tons[used]
+
+
+def block_figure(times, weights, block, title):
+    """Bars of the tons rolled per ``block``, labelled with their coil count."""
+    starts, counts, tons = block_totals(times, weights, block)
+    data = [go.Bar(x=np.datetime_as_string(starts, unit='s'), y=np.round(tons, 1), text=counts,
+                   width=int(block.astype('timedelta64[ms]').astype(np.int64)), offset=0,
+                   hovertemplate='%{x}<br>%{text} coils<br>%{y} t<extra></extra>')]
+    layout = dict(title=title,
+                  xaxis={'type': 'date', 'showgrid': True},
+                  yaxis={'title': 'Tons', 'showgrid': True},
+                  hovermode='closest')
+    return dict(data=data, layout=layout)
+
+
+def timeline_figure(index, start, end, title, uirevision=None):
+    """Coil timeline of ``[start, end)`` from a TimeIndex on Start.
+
+    Returns ``(figure, view, coils)``: view is 'coil' when single coils are
+    drawn, else the name of the block they were collapsed into. Only the
+    rows inside the window are read.
+    """
+    lo, hi = index.span(start, end)
+    if hi - lo <= DETAIL_COILS:
+        view = 'coil'
+        figure = gantt_figure(index.frame.take(index.order[lo:hi]), title)
+        figure['layout']['height'] = max(450, 120 + 18 * (hi - lo))
+    else:
+        span = np.datetime64(pd.Timestamp(end)) - np.datetime64(pd.Timestamp(start))
+        view, block = next(((name, block) for name, block in BLOCKS if span / block <= MAX_BLOCKS), BLOCKS[-1])
+        figure = block_figure(index.times[lo:hi], index.values('EXITWEIGHTMEAS', lo, hi), block,
+                              '{} per {}'.format(title, view))
+    figure['layout']['xaxis']['range'] = [pd.Timestamp(start).isoformat(), pd.Timestamp(end).isoformat()]
+    figure['layout']['uirevision'] = uirevision
+    return figure, view, hi - lo
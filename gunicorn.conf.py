@@ -0,0 +1,31 @@
+import gc
+import os
+
+# Threaded workers hold the /events streams (see push.py). Each open page
+# keeps one thread busy, so a worker streams to at most PUSH_MAX_STREAMS
+# pages and leaves the other threads to the callbacks; further pages poll
+# /versions. Raise WEB_CONCURRENCY for more tabs on streams: workers times
+# PUSH_MAX_STREAMS. The app is imported and its datasets loaded once in the
+# master, before the workers are forked, so every worker starts warm and
+# shares those pages copy-on-write instead of parsing the exports again
+# after each deploy or worker recycle.
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 32))
+preload_app = True
+
+
+def when_ready(server):
+    import datamanager
+    state = datamanager.warm_up()
+    server.log.info('datasets loaded in %ss: %s', state['seconds'], state['datasets'])
+    # moves the loaded objects out of the collector's reach, so its passes in
+    # the workers do not write to (and thereby copy) the shared pages
+    gc.freeze()
+
+
+def post_worker_init(worker):
+    # only does work when the app was not preloaded in the master
+    import datamanager
+    if not datamanager.readiness()['ready']:
+        datamanager.warm_up()
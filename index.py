@@ -1,5 +1,6 @@
 import dash_core_components as dcc
 import dash_html_components as html
+import datamanager
 from app import app, dbc
 from apps import production, stoptime, process_data, segment_data, segment_report
 from dash.dependencies import Input, Output
@@ -90,4 +91,5 @@ def render_page_content(pathname):
 server = app.server
 
 if __name__ == "__main__":
+    datamanager.warm_up()
     app.run_server(debug=True)
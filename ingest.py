@@ -0,0 +1,124 @@
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+
+class AppendOnlyTable(object):
+    """Columnar table that grows in place.
+
+    Every column lives in a buffer with spare capacity, so appending ``k``
+    rows costs O(k) amortized, and so does ``frame()``: it views the
+    buffers, including those of extension dtypes such as the pandas 3
+    strings, which are kept as arrays of their own dtype rather than
+    object arrays pandas would scan again. Rows already written are never
+    modified and frames returned by ``frame()`` stay valid after later
+    appends.
+    """
+
+    def __init__(self, frame):
+        self.columns = list(frame.columns)
+        self._length = len(frame)
+        self._buffers = {}
+        for column in self.columns:
+            values = _values(frame[column])
+            self._buffers[column] = _grown(values, len(values), max(16, 2 * len(values)))
+        self._frame = frame.reset_index(drop=True)
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def capacity(self):
+        return len(self._buffers[self.columns[0]]) if self.columns else 0
+
+    def append(self, frame):
+        rows = len(frame)
+        if not rows:
+            return
+        needed = self._length + rows
+        if needed > self.capacity:
+            capacity = max(needed, 2 * self.capacity)
+            for column, buffer in self._buffers.items():
+                self._buffers[column] = _grown(buffer, self._length, capacity)
+        for column, buffer in self._buffers.items():
+            if isinstance(buffer, np.ndarray):
+                buffer[self._length:needed] = frame[column].to_numpy(dtype=buffer.dtype)
+            else:
+                buffer[self._length:needed] = _values(frame[column])
+        self._length = needed
+        self._frame = None
+
+    def frame(self):
+        """DataFrame over the rows written so far."""
+        if self._frame is None:
+            self._frame = pd.DataFrame({column: self._buffers[column][:self._length] for column in self.columns},
+                                       copy=False)
+        return self._frame
+
+
+def _values(column):
+    if isinstance(column.dtype, np.dtype):
+        return column.to_numpy()
+    return column.array
+
+
+def _grown(buffer, length, capacity):
+    """The first ``length`` rows of ``buffer`` in a new buffer of ``capacity`` rows."""
+    if isinstance(buffer, np.ndarray):
+        grown = np.empty(capacity, dtype=buffer.dtype)
+        grown[:length] = buffer[:length]
+        return grown
+    # extension arrays are padded with missing values by take, which does
+    # not validate the rows again
+    return buffer.take(np.concatenate([np.arange(length), np.full(capacity - length, -1)]), allow_fill=True)
+
+
+class CsvFeed(object):
+    """Reads the rows appended to a CSV export since the last ``commit()``.
+
+    Only complete lines are consumed. If the file shrinks it is assumed to
+    have been rotated and is read again from the start; the caller drops
+    rows it has already seen. Rows returned by ``read_new`` are read again
+    until the caller commits them, so a batch that fails to be taken in is
+    not lost.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.offset = 0
+        self.header = None
+        self._read = None
+
+    def read_new(self, dtype=None):
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return None
+        offset, header = self.offset, self.header
+        if size < offset:
+            offset, header = 0, None
+        if size == offset:
+            return None
+        with open(self.path, 'rb') as feed:
+            feed.seek(offset)
+            chunk = feed.read(size - offset)
+        complete = chunk.rfind(b'\n') + 1
+        if not complete:
+            return None
+        text = chunk[:complete].decode('utf-8')
+        if header is None:
+            line, _, text = text.partition('\n')
+            header = next(iter(pd.read_csv(io.StringIO(line), header=None).itertuples(index=False)))
+        self._read = (offset + complete, header)
+        if not text.strip():
+            self.commit()
+            return None
+        return pd.read_csv(io.StringIO(text), header=None, names=list(header), dtype=dtype)
+
+    def commit(self):
+        """Move past the rows returned by the last ``read_new``."""
+        if self._read is not None:
+            self.offset, self.header = self._read
+            self._read = None
@@ -0,0 +1,102 @@
+import json
+import os
+import threading
+import time
+
+import flask
+
+import datamanager
+
+# how often the watcher checks the sources for a new data version, and how
+# long an idle event stream waits before sending a keep-alive comment
+POLL_SECONDS = float(os.environ.get('PUSH_POLL_SECONDS', 0.5))
+KEEPALIVE_SECONDS = 15
+# open event streams per process. Each holds a worker thread for as long as
+# its page is open, so this must stay well below the threads of a worker
+# (see gunicorn.conf.py) to leave room for the callbacks; pages beyond the
+# limit poll /versions instead.
+MAX_STREAMS = int(os.environ.get('PUSH_MAX_STREAMS', 16))
+
+
+class VersionWatcher(object):
+    """Polls ``datamanager.current_versions()`` in one background thread.
+
+    Every event stream of the process waits on the same condition, so the
+    sources are checked once per interval however many browsers are
+    connected. The thread is started by the first stream, which keeps it out
+    of a gunicorn master that forks its workers after loading the app.
+    """
+
+    def __init__(self, interval=POLL_SECONDS):
+        self.interval = interval
+        self.versions = {}
+        self._changed = threading.Condition()
+        self._thread = None
+
+    def start(self):
+        with self._changed:
+            if self._thread is None:
+                self.versions = datamanager.current_versions()
+                self._thread = threading.Thread(target=self._run, name='version-watcher', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                versions = datamanager.current_versions()
+            except Exception as error:
+                print('version watcher: {}'.format(error))
+                versions = self.versions
+            if versions != self.versions:
+                with self._changed:
+                    self.versions = versions
+                    self._changed.notify_all()
+            time.sleep(self.interval)
+
+    def wait(self, seen, timeout):
+        """The current versions once they differ from ``seen``, or ``seen`` after ``timeout``."""
+        with self._changed:
+            self._changed.wait_for(lambda: self.versions != seen, timeout)
+            return self.versions
+
+
+watcher = VersionWatcher()
+_streams = threading.BoundedSemaphore(MAX_STREAMS)
+
+
+def event_stream():
+    watcher.start()
+    versions = watcher.versions
+    yield 'retry: 2000\nevent: versions\ndata: {}\n\n'.format(json.dumps(versions))
+    while True:
+        current = watcher.wait(versions, KEEPALIVE_SECONDS)
+        if current == versions:
+            # keeps proxies from closing the idle connection
+            yield ': keep-alive\n\n'
+        else:
+            versions = current
+            yield 'event: versions\ndata: {}\n\n'.format(json.dumps(versions))
+
+
+def init_push(server):
+    """Serve the data versions as Server-Sent Events on ``/events``.
+
+    Each open page holds one connection, so run gunicorn with threaded
+    workers (see the Procfile) rather than one sync worker per browser.
+    Once ``MAX_STREAMS`` streams are open ``/events`` answers 503 and the
+    pages fall back to polling the same versions on ``/versions``.
+    """
+    @server.route('/events')
+    def events():
+        if not _streams.acquire(blocking=False):
+            return flask.Response('too many event streams', status=503, headers={'Retry-After': '60'})
+        response = flask.Response(event_stream(), mimetype='text/event-stream',
+                                  headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+        # the stream ends when the client goes away and the response is closed
+        response.call_on_close(_streams.release)
+        return response
+
+    @server.route('/versions')
+    def versions():
+        watcher.start()
+        return flask.jsonify(watcher.versions)
@@ -0,0 +1,232 @@
+import hashlib
+import os
+import sys
+
+import numpy as np
+
+from telegram_decoder import MEASURING_POINTS, TelegramDecoder, segment_times, TIME_FIELD
+
+MAGIC = b'MPRING01'
+# 64 byte file header; ``count`` is the number of records ever appended and is
+# only advanced after the records it covers have been written
+HEADER = np.dtype([
+    ('magic', 'S8'),
+    ('capacity', '<u8'),
+    ('itemsize', '<u8'),
+    ('count', '<u8'),
+    ('spare', '<u8', 4),
+])
+
+
+class RingBuffer(object):
+    """Fixed-size record ring in a memory-mapped file.
+
+    One writer appends records together with their time stamps; any number
+    of readers in other processes map the same file read-only and see new
+    records as soon as ``count`` moves. Once ``capacity`` records are held the
+    oldest ones are overwritten, so the file never grows.
+
+    ``read()`` returns views on the mapping when the requested records do not
+    wrap around the end of the file, and a copy of just those records when
+    they do. Readers should size ``capacity`` well above the window they read
+    so the writer never reaches records while they are in use.
+    """
+
+    def __init__(self, path, dtype, capacity=None, writable=False):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.writable = writable
+        self._stat = None
+        self._header = self._times = self._records = None
+        if writable:
+            self._create(capacity)
+        self._map()
+
+    def _create(self, capacity):
+        if os.path.exists(self.path):
+            header = np.fromfile(self.path, dtype=HEADER, count=1)
+            if (len(header) and header[0]['magic'] == MAGIC and header[0]['itemsize'] == self.dtype.itemsize
+                    and (capacity is None or header[0]['capacity'] == capacity)):
+                return
+        if capacity is None:
+            raise ValueError('capacity is required to create {}'.format(self.path))
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        # build the new file aside so readers never map a half written one
+        temp = '{}.{}.tmp'.format(self.path, os.getpid())
+        with open(temp, 'wb') as ring:
+            header = np.zeros(1, dtype=HEADER)
+            header['magic'] = MAGIC
+            header['capacity'] = capacity
+            header['itemsize'] = self.dtype.itemsize
+            ring.write(header.tobytes())
+            ring.truncate(HEADER.itemsize + capacity * (8 + self.dtype.itemsize))
+        os.replace(temp, self.path)
+
+    def _map(self):
+        """(Re)map the file if the writer has replaced it since the last call."""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            self._stat = self._header = self._times = self._records = None
+            return False
+        if self._stat is not None and (stat.st_ino, stat.st_size) == self._stat:
+            return True
+        mode = 'r+' if self.writable else 'r'
+        header = np.memmap(self.path, dtype=HEADER, mode=mode, shape=(1,))
+        capacity = int(header[0]['capacity'])
+        if header[0]['magic'] != MAGIC or header[0]['itemsize'] != self.dtype.itemsize:
+            raise ValueError('{} does not hold {} byte records'.format(self.path, self.dtype.itemsize))
+        self._header = header
+        self._times = np.memmap(self.path, dtype='<i8', mode=mode, offset=HEADER.itemsize, shape=(capacity,))
+        self._records = np.memmap(self.path, dtype=self.dtype, mode=mode,
+                                  offset=HEADER.itemsize + 8 * capacity, shape=(capacity,))
+        self._stat = (stat.st_ino, stat.st_size)
+        return True
+
+    @property
+    def capacity(self):
+        return 0 if self._times is None else len(self._times)
+
+    @property
+    def count(self):
+        return 0 if self._header is None else int(self._header[0]['count'])
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append(self, times, records):
+        """Append records with their datetime64 time stamps."""
+        times = np.asarray(times, dtype='datetime64[ms]').astype('<i8')
+        records = np.asarray(records, dtype=self.dtype)
+        if len(times) != len(records):
+            raise ValueError('times and records differ in length')
+        if len(records) > self.capacity:
+            times, records = times[-self.capacity:], records[-self.capacity:]
+        count = self.count
+        positions = (count + np.arange(len(records))) % self.capacity
+        self._times[positions] = times
+        self._records[positions] = records
+        self._header['count'] = count + len(records)
+
+    def read(self, window=None):
+        """Records, oldest first, and their times as ``(times, records)``.
+
+        ``window`` (a timedelta64) keeps only the records within that span of
+        the newest one.
+        """
+        if not self._map():
+            return np.empty(0, dtype='datetime64[ms]'), np.empty(0, dtype=self.dtype)
+        count, capacity = self.count, self.capacity
+        first = max(0, count - capacity)
+        if window is not None and count:
+            first = self._window_start(first, count, np.timedelta64(window, 'ms').astype('<i8'))
+        times, records = self._span(first, count)
+        # records the writer overwrote while they were copied are dropped
+        overwritten = self.count - capacity - first
+        if overwritten > 0:
+            times, records = times[overwritten:], records[overwritten:]
+        return times.view('datetime64[ms]'), records
+
+    def _span(self, first, last):
+        start, stop = first % self.capacity, last % self.capacity or self.capacity
+        if last - first and start >= stop:
+            return (np.concatenate([self._times[start:], self._times[:stop]]),
+                    np.concatenate([self._records[start:], self._records[:stop]]))
+        return np.asarray(self._times[start:start + last - first]), np.asarray(self._records[start:start + last - first])
+
+    def _window_start(self, first, count, window):
+        newest = self._times[(count - 1) % self.capacity]
+        start = first % self.capacity
+        # the held records are two sorted runs: [start:] and then [:start]
+        older = self._times[start:] if count > self.capacity else self._times[start:count]
+        position = np.searchsorted(older, newest - window, side='left')
+        if position < len(older):
+            return first + position
+        return first + len(older) + np.searchsorted(self._times[:start], newest - window, side='left')
+
+
+class MeasuringPointStore(object):
+    """One ring buffer per measuring point under ``directory``.
+
+    Each ring holds the telegram records of its point as the dtype of that
+    telegram (M21 at the stands, M22 between them, M23 before the first and
+    M24 after the last stand), so readers get the decoder's columns back.
+    """
+
+    def __init__(self, directory, capacity=None, window=None, writable=False):
+        self.directory = directory
+        self.capacity = capacity
+        self.window = window
+        self.writable = writable
+        self.decoder = TelegramDecoder()
+        self._rings = {}
+
+    def ring(self, point):
+        ring = self._rings.get(point)
+        if ring is None:
+            name = next(name for name, p in MEASURING_POINTS.items() if p == point)
+            path = os.path.join(self.directory, 'mp_{:02d}.ring'.format(point))
+            ring = RingBuffer(path, self.decoder.dtypes[name], self.capacity, self.writable)
+            self._rings[point] = ring
+        return ring
+
+    def append(self, buffer):
+        """Decode a chunk of raw telegrams and append them to their points.
+
+        Returns the number of bytes consumed; a trailing partial telegram is
+        left for the next chunk.
+        """
+        _, _, end = self.decoder.offsets(buffer)
+        for name, records in self.decoder.decode(memoryview(buffer)[:end]).items():
+            if name in MEASURING_POINTS:
+                self.ring(MEASURING_POINTS[name]).append(segment_times(records[TIME_FIELD]), records)
+        return end
+
+    def columns(self, point, window=None):
+        """``{'time': ..., field: ...}`` arrays of one point within the window."""
+        times, records = self.ring(point).read(self.window if window is None else window)
+        data = {'time': times}
+        for field in records.dtype.names:
+            values = records[field]
+            data[field] = np.char.strip(values) if values.dtype.kind == 'S' else values
+        return data
+
+    def points(self, window=None):
+        return {point: self.columns(point, window) for point in sorted(MEASURING_POINTS.values())}
+
+    def version(self):
+        """Token that changes whenever a ring is appended to or replaced, None while there is none.
+
+        Built from the ring files and their record counts only, so every
+        process reading the same rings agrees on it.
+        """
+        stamps = []
+        for point in sorted(MEASURING_POINTS.values()):
+            ring = self.ring(point)
+            if ring._map():
+                stamps.append((point, ring._stat, ring.count))
+        if not stamps:
+            return None
+        return hashlib.blake2b(repr(stamps).encode(), digest_size=8).hexdigest()
+
+
+def write_stream(store, stream, chunk_size=1 << 20):
+    """Append raw telegrams read from ``stream`` until it is exhausted."""
+    pending = b''
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        pending += chunk
+        pending = pending[store.append(pending):]
+    return len(pending)
+
+
+if __name__ == '__main__':
+    if sys.argv[1:] == ['write']:
+        import datamanager
+        write_stream(datamanager.measuring_point_store(writable=True), sys.stdin.buffer)
+    else:
+        print('usage: python ringbuffer.py write < telegram-stream')
@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+
+ONE_DAY = np.timedelta64(1, 'D')
+
+
+def _day(value):
+    return np.datetime64(pd.Timestamp(value), 'ns')
+
+
+def month_labels(months):
+    """'YYYY-MM' labels for month numbers counted as ``year * 12 + month - 1``."""
+    return ['{:04d}-{:02d}'.format(m // 12, m % 12 + 1) for m in months]
+
+
+class DailyRollup(object):
+    """Per-day partial aggregates of the coil table.
+
+    Coils are summed into one row per production day and
+    ALLOYCODE/ENTRYWIDTH/EXITTHICK combination, holding the coil count, the
+    summed weight and the sum/min/max of the exit thickness. Year, month, day
+    or key breakdowns over any date range are answered by merging those rows,
+    so the cost grows with the number of days rather than coils.
+    """
+
+    KEYS = ['ALLOYCODE', 'ENTRYWIDTH', 'EXITTHICK']
+    FIELDS = ['count', 'weight', 'thick_sum', 'thick_min', 'thick_max']
+    # how partials of the same group are merged
+    MERGE = {'count': 'sum', 'weight': 'sum', 'thick_sum': 'sum', 'thick_min': 'min', 'thick_max': 'max'}
+
+    def __init__(self, partials):
+        self.partials = partials.sort_values('DAY', kind='mergesort').reset_index(drop=True)
+        self._days = self.partials['DAY'].to_numpy(dtype='datetime64[ns]')
+
+    @classmethod
+    def from_coils(cls, coils, time_column='DTENDROLLING'):
+        return cls(cls.partials_of(coils, time_column))
+
+    @classmethod
+    def partials_of(cls, coils, time_column='DTENDROLLING'):
+        day = coils[time_column].dt.normalize().rename('DAY')
+        return coils.groupby([day] + [coils[key] for key in cls.KEYS], dropna=False, sort=False).agg(
+            count=('EXITTHICK', 'size'),
+            weight=('EXITWEIGHTMEAS', 'sum'),
+            thick_sum=('EXITTHICK', 'sum'),
+            thick_min=('EXITTHICK', 'min'),
+            thick_max=('EXITTHICK', 'max'),
+        ).reset_index()
+
+    def merge(self, coils, time_column='DTENDROLLING'):
+        """Return a new rollup that also covers ``coils``.
+
+        Only the partials of the days the new coils fall on are regrouped.
+        """
+        new = self.partials_of(coils, time_column)
+        if new.empty:
+            return self
+        first = np.searchsorted(self._days, new['DAY'].min().to_datetime64().astype('datetime64[ns]'), side='left')
+        touched = pd.concat([self.partials.iloc[first:], new], ignore_index=True)
+        touched = touched.groupby(['DAY'] + self.KEYS, dropna=False, sort=False).agg(self.MERGE).reset_index()
+        return DailyRollup(pd.concat([self.partials.iloc[:first], touched], ignore_index=True))
+
+    def __len__(self):
+        return len(self.partials)
+
+    def days(self, start_date=None, end_date=None):
+        """Partial rows of the days overlapping ``(start_date, end_date]``.
+
+        Bounds are applied per day: a bound falling inside a day includes that
+        whole day, and a coil finishing exactly at midnight on a bound counts
+        for its calendar day. For date-only bounds this only differs from
+        filtering the coils themselves in that midnight case.
+        """
+        lo = 0 if start_date is None else np.searchsorted(self._days, _day(start_date) - ONE_DAY, side='right')
+        hi = len(self._days) if end_date is None else np.searchsorted(self._days, _day(end_date), side='left')
+        return self.partials.iloc[lo:max(lo, hi)]
+
+    def totals(self, start_date=None, end_date=None, by='day'):
+        """Merge the partials of a date range by 'year', 'month', 'day' or a key column.
+
+        The result has one row per group with the merged fields and
+        ``thick_mean``; the group column is named after ``by``.
+        """
+        partials = self.days(start_date, end_date)
+        days = partials['DAY'].dt
+        if by == 'year':
+            group = days.year
+        elif by == 'month':
+            group = days.year * 12 + days.month - 1
+        elif by == 'day':
+            group = partials['DAY']
+        else:
+            group = partials[by]
+        totals = partials[self.FIELDS].groupby(group.rename(by).to_numpy(), dropna=False).agg(self.MERGE)
+        totals.index.name = by
+        totals['thick_mean'] = totals['thick_sum'] / totals['count']
+        totals = totals.reset_index()
+        if by == 'month':
+            totals['month'] = month_labels(totals['month'])
+        return totals
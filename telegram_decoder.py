@@ -0,0 +1,175 @@
+import operator
+import struct
+
+import numpy as np
+
+import telegram_definition_L1 as definition
+
+# Every telegram starts with its message id and the length of the body in
+# bytes, followed by the body laid out as the teltype of that message. The
+# default layout of TelegramDecoder; other fields of a header are skipped.
+HEADER = [
+    ('MessageId', 'u2'),
+    ('Length', 'u2'),
+]
+
+# measuring point of the cyclic segment telegrams sent by each L1 channel:
+# 00 before the first stand, odd points at the stands, even points between
+# them and 10 after the last stand
+MEASURING_POINTS = {
+    'L1C1_M23': 0,
+    'L1C1_M21': 1, 'L1C1_M22': 2,
+    'L1C2_M21': 3, 'L1C2_M22': 4,
+    'L1C3_M21': 5, 'L1C3_M22': 6,
+    'L1C4_M21': 7, 'L1C4_M22': 8,
+    'L1C5_M21': 9,
+    'L1C5_M24': 10,
+}
+
+# field holding the segment start time as year, month, day, hour, minute,
+# second and millisecond
+TIME_FIELD = 'TmSegStart'
+
+
+def telegram_dtype(name, byteorder='>'):
+    """Structured dtype of the body of telegram ``name`` (e.g. 'L1C2_M21')."""
+    teltype = getattr(definition, 'teltype_' + name.rsplit('_', 1)[-1])
+    return np.dtype(teltype).newbyteorder(byteorder)
+
+
+class TelegramDecoder(object):
+    """Decodes raw L1 telegram streams into structured arrays.
+
+    The stream is walked header to header, which only touches the header
+    bytes of each telegram. Bodies are then viewed through the telegram dtypes with
+    ``np.frombuffer``: when all telegrams of a message id are equally spaced
+    (a capture of one message type, or a fixed rotation of types) the result
+    is a strided view on the input buffer without any copy, otherwise the
+    bodies of that id are gathered in one vectorized copy. Telegrams with an
+    unknown id are skipped using their length field.
+
+    ``header`` describes the telegram header as a dtype; it needs a
+    'MessageId' and a 'Length' field.
+    """
+
+    def __init__(self, byteorder='>', header=HEADER):
+        self.byteorder = byteorder
+        self.header = np.dtype(header).newbyteorder(byteorder)
+        fields = sorted(self.header.fields.items(), key=lambda item: item[1][1])
+        layout, position, picked = [], 0, []
+        for field, (dtype, offset) in fields:
+            if offset > position:
+                layout.append('{}x'.format(offset - position))
+            if field in ('MessageId', 'Length'):
+                layout.append({1: 'B', 2: 'H', 4: 'I', 8: 'Q'}[dtype.itemsize])
+                picked.append(field)
+            else:
+                layout.append('{}x'.format(dtype.itemsize))
+            position = offset + dtype.itemsize
+        self._header = struct.Struct(byteorder + ''.join(layout))
+        self._pick = operator.itemgetter(picked.index('MessageId'), picked.index('Length'))
+        self.names = {}
+        self.dtypes = {}
+        # telegrams skipped for a body shorter than their teltype, per name
+        self.short = {}
+        for name, message_id in definition.messageId.items():
+            try:
+                dtype = telegram_dtype(name, byteorder)
+            except AttributeError:
+                continue
+            self.names[int(message_id, 16)] = name
+            self.dtypes[name] = dtype
+
+    def offsets(self, buffer):
+        """Message ids and body offsets of the complete telegrams in ``buffer``.
+
+        Returns ``(ids, offsets, end)`` where ``end`` is the number of bytes
+        consumed; a trailing partial telegram is left for the next call.
+        """
+        view = memoryview(buffer).cast('B')
+        size = len(view)
+        step = self.header.itemsize
+        unpack = self._header.unpack_from
+        pick = self._pick
+        ids, offsets = [], []
+        position = 0
+        while position + step <= size:
+            message_id, length = pick(unpack(view, position))
+            if position + step + length > size:
+                break
+            ids.append(message_id)
+            offsets.append(position + step)
+            position += step + length
+        return np.array(ids, dtype=self.header['MessageId'].newbyteorder('=')), np.array(offsets, dtype=np.int64), position
+
+    def decode(self, buffer):
+        """Structured arrays of the telegrams in ``buffer`` keyed by message name.
+
+        Telegrams whose length field is shorter than their teltype are
+        skipped and counted in ``short``.
+        """
+        ids, offsets, end = self.offsets(buffer)
+        step = self.header.itemsize
+        # telegrams follow each other, so each body ends at the next header
+        lengths = np.diff(offsets, append=end + step) - step
+        raw = np.frombuffer(buffer, dtype=np.uint8)
+        records = {}
+        for message_id in np.unique(ids):
+            name = self.names.get(int(message_id))
+            if name is None:
+                continue
+            dtype = self.dtypes[name]
+            selected = ids == message_id
+            short = int(np.count_nonzero(selected & (lengths < dtype.itemsize)))
+            if short:
+                self.short[name] = self.short.get(name, 0) + short
+                selected &= lengths >= dtype.itemsize
+                if not selected.any():
+                    continue
+            records[name] = self._bodies(raw, offsets[selected], dtype)
+        return records
+
+    @staticmethod
+    def _bodies(raw, offsets, dtype):
+        if len(offsets) == 1 or np.all(np.diff(offsets) == offsets[1] - offsets[0]):
+            stride = int(offsets[1] - offsets[0]) if len(offsets) > 1 else dtype.itemsize
+            if stride >= dtype.itemsize:
+                return np.ndarray((len(offsets),), dtype=dtype, buffer=raw, offset=int(offsets[0]),
+                                  strides=(stride,))
+        gathered = raw[offsets[:, None] + np.arange(dtype.itemsize)]
+        return np.frombuffer(gathered.tobytes(), dtype=dtype)
+
+    def measuring_points(self, buffer):
+        """Columnar arrays per measuring point.
+
+        Returns ``{point: {'time': datetime64 array, field: array, ...}}``.
+        Fields with several values per telegram stay two dimensional.
+        """
+        points = {}
+        for name, records in self.decode(buffer).items():
+            if name in MEASURING_POINTS:
+                points[MEASURING_POINTS[name]] = columns(records)
+        return points
+
+
+def segment_times(stamps):
+    """datetime64[ms] from the year, month, day, ... integer arrays of the telegrams."""
+    stamps = np.asarray(stamps, dtype=np.int64)
+    months = (stamps[:, 0] - 1970) * 12 + stamps[:, 1] - 1
+    days = months.astype('datetime64[M]').astype('datetime64[D]') + (stamps[:, 2] - 1)
+    return (days.astype('datetime64[ms]') + stamps[:, 3].astype('timedelta64[h]')
+            + stamps[:, 4].astype('timedelta64[m]') + stamps[:, 5].astype('timedelta64[s]')
+            + stamps[:, 6].astype('timedelta64[ms]'))
+
+
+def columns(records):
+    """Split a structured array into one array per field, plus 'time'."""
+    data = {}
+    if TIME_FIELD in records.dtype.names:
+        data['time'] = segment_times(records[TIME_FIELD])
+    for field in records.dtype.names:
+        values = records[field]
+        if values.dtype.kind == 'S':
+            values = np.char.strip(values)
+        data[field] = values
+    return data
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+
+class TimeIndex(object):
+    """Rows of a frame in the order of one of its time columns.
+
+    The frame itself is left as it is: ``order`` holds its row positions
+    sorted by ``column``, leaving out rows without a time, and ``times`` the
+    matching times. Any time window is then two binary searches and a take
+    of just the rows inside it, however long the history is.
+    """
+
+    def __init__(self, frame, column):
+        times = frame[column].to_numpy()
+        valid = np.flatnonzero(~np.isnat(times))
+        self.frame = frame
+        self.column = column
+        self.order = valid[np.argsort(times[valid], kind='stable')]
+        self.times = times[self.order]
+
+    def extended(self, frame):
+        """Index of ``frame``, whose first rows are this index's frame and the rest new.
+
+        Only the new rows are sorted; they are then merged into the order,
+        which costs a copy instead of a sort of the whole history.
+        """
+        held = len(self.frame)
+        times = frame[self.column].to_numpy()[held:]
+        valid = np.flatnonzero(~np.isnat(times))
+        order = valid[np.argsort(times[valid], kind='stable')]
+        times = times[order]
+        # after the held rows of the same time, as a stable sort of the whole frame puts them
+        positions = np.searchsorted(self.times, times, side='right')
+        index = TimeIndex.__new__(TimeIndex)
+        index.frame = frame
+        index.column = self.column
+        index.order = np.insert(self.order, positions, order + held)
+        index.times = np.insert(self.times, positions, times)
+        return index
+
+    def __len__(self):
+        return len(self.order)
+
+    def span(self, start=None, end=None):
+        """``(lo, hi)`` positions in ``order`` of the rows with ``start <= time < end``."""
+        lo = 0 if start is None else int(np.searchsorted(self.times, self._bound(start), side='left'))
+        hi = len(self.times) if end is None else int(np.searchsorted(self.times, self._bound(end), side='left'))
+        return lo, max(lo, hi)
+
+    def window(self, start=None, end=None):
+        """Rows with ``start <= time < end``, in time order."""
+        lo, hi = self.span(start, end)
+        return self.frame.take(self.order[lo:hi])
+
+    def values(self, column, lo, hi):
+        """``column`` of the rows between positions ``lo`` and ``hi``, in time order."""
+        return self.frame[column].to_numpy()[self.order[lo:hi]]
+
+    def _bound(self, value):
+        # in the index's own unit, so searchsorted does not cast the times
+        return pd.Timestamp(value).to_datetime64().astype(self.times.dtype)
@@ -0,0 +1,146 @@
+import os
+
+import dash
+import numpy as np
+import plotly.graph_objs as go
+from dash.exceptions import PreventUpdate
+
+from datamanager import coalesce
+from downsample import relayout_range, view_indices
+
+# Figures drawing more points than this switch to WebGL traces. SVG redraws
+# every point as a DOM node and stutters beyond a few thousand of them.
+GL_THRESHOLD = int(os.environ.get('PLOT_GL_THRESHOLD', 5000))
+# most points a streamed trace keeps in the browser; extendData drops the
+# oldest ones beyond it
+STREAM_MAX_POINTS = int(os.environ.get('PLOT_STREAM_MAX_POINTS', 5000))
+
+
+def point_traces(points, labels, items, x_range=None, dashes=None, threshold=GL_THRESHOLD):
+    """Line traces of the ``items`` columns at the measuring points in ``labels``.
+
+    ``points`` maps measuring points to their frames and ``labels`` the points
+    to plot to the suffix of their trace names, in plotting order. Each trace
+    is downsampled to ``x_range``; once the whole figure holds more than
+    ``threshold`` points every trace is drawn as ``Scattergl``.
+    """
+    dashes = dashes or {}
+    selected = []
+    for point in labels:
+        frame = points[point]
+        time = frame['time'].to_numpy()
+        for item in items:
+            values = frame[item].to_numpy()
+            selected.append((point, item, time, values, view_indices(time, values, x_range)))
+    trace = go.Scattergl if sum(len(index) for *_, index in selected) > threshold else go.Scatter
+    return [trace(x=time[index], y=values[index], name=item + labels[point],
+                  line=dict(dash=dashes.get(point, 'solid'), width=2))
+            for point, item, time, values, index in selected]
+
+
+def item_options(points, labels, fields):
+    """Dropdown options for the ``fields`` of a teltype held by the frames of the points in ``labels``.
+
+    A field the frames split into one column per value (``Field_0``,
+    ``Field_1``, ...) is offered as those columns, a field they lack not at
+    all.
+    """
+    columns = set.intersection(*(set(points[point].columns) for point in labels))
+    options = []
+    for field in fields:
+        if field in columns:
+            names = [field]
+        else:
+            names = []
+            while '{}_{}'.format(field, len(names)) in columns:
+                names.append('{}_{}'.format(field, len(names)))
+        options.extend({'label': name, 'value': name} for name in names)
+    return options
+
+
+def _series(labels, items):
+    # (point, item) of every trace in the order point_traces builds them
+    return [(point, item) for point in labels for item in items]
+
+
+def point_cursors(points, labels, items):
+    """Time of the newest sample of every trace of ``point_traces``.
+
+    Kept per session in a dcc.Store, as ISO text so no precision is lost in
+    the browser.
+    """
+    cursors = []
+    for point, item in _series(labels, items):
+        time = points[point]['time']
+        cursors.append(str(time.iat[-1]) if len(time) else None)
+    return cursors
+
+
+def point_extension(points, labels, items, cursors, max_points=STREAM_MAX_POINTS):
+    """``extendData`` with the samples newer than ``cursors`` and the new cursors.
+
+    Returns ``(None, cursors)`` when no trace has new samples.
+    """
+    xs, ys, indices, moved = [], [], [], list(cursors)
+    for trace, (point, item) in enumerate(_series(labels, items)):
+        frame = points[point]
+        time = frame['time'].to_numpy()
+        start = 0 if cursors[trace] is None else np.searchsorted(time, np.datetime64(cursors[trace]), side='right')
+        if start == len(time):
+            continue
+        start = max(start, len(time) - max_points)
+        xs.append(time[start:])
+        ys.append(frame[item].to_numpy()[start:])
+        indices.append(trace)
+        moved[trace] = str(frame['time'].iat[-1])
+    if not indices:
+        return None, cursors
+    return ({'x': xs, 'y': ys}, indices, max_points), moved
+
+
+def stream_tick(refresh, cursor, items):
+    """Whether this call was triggered by ``refresh`` alone for the traces in ``cursor``.
+
+    Selection, zoom and first loads rebuild the whole figure; data refreshes
+    for an unchanged selection only extend it.
+    """
+    triggered = [trigger['prop_id'] for trigger in dash.callback_context.triggered]
+    return bool(cursor) and cursor.get('items') == items and triggered == [refresh]
+
+
+def point_figure(points, labels, items, layout, refresh, cursor, relayout_data, dashes=None):
+    """``(figure, extendData, cursor)`` outputs of a streaming measuring point plot.
+
+    Calls triggered by ``refresh`` (e.g. 'segment_version.data') push only
+    the samples that arrived since the session's cursor; anything else sends
+    the whole figure and resets the cursor.
+    """
+    if stream_tick(refresh, cursor, items):
+        extension, cursors = point_extension(points, labels, items, cursor['cursors'])
+        if extension is None:
+            raise PreventUpdate
+        return dash.no_update, extension, dict(cursor, cursors=cursors)
+    x_range = relayout_range(relayout_data)
+    # every screen asks for the same figure when new data arrives; ``points``
+    # stays alive, and its id unique, while the call is in flight
+    flight = ('point_traces', id(points), tuple(labels.items()), tuple(items), x_range,
+              tuple(sorted((dashes or {}).items())))
+    data = coalesce(flight, point_traces, points, labels, items, x_range, dashes)
+    cursor = {'items': items, 'cursors': point_cursors(points, labels, items)}
+    return dict(data=data, layout=layout), dash.no_update, cursor
+
+
+def time_layout(title, rangeslider=True, uirevision=None):
+    """Layout of the measuring point plots, keeping the zoom across refreshes."""
+    return dict(title=title,
+                xaxis={"title": "Date Time",
+                       'rangeselector': {'buttons': list([
+                           {'count': 1, 'label': '1M', 'step': 'minute', 'stepmode': 'backward'},
+                           {'count': 10, 'label': '6M', 'step': 'minute', 'stepmode': 'backward'},
+                           {'step': 'all'}
+                       ])}, 'rangeslider': {'visible': rangeslider}, 'type': 'date'},
+                margin={'l': 40, 'b': 40, 't': 10, 'r': 10},
+                legend={'x': 0, 'y': 1},
+                hovermode='closest',
+                uirevision=uirevision
+                )